@@ -0,0 +1,107 @@
+from settings import ROWS, COLS
+
+# Attack and ray tables, built once at import and indexed by square
+# (row * COLS + col, the same numbering as bitboard.py).
+
+KNIGHT_DELTAS = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+KING_DELTAS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+# Rays that run towards higher square numbers stop at their lowest set bit,
+# the others at their highest one.
+POSITIVE_ORTHOGONAL = [(1, 0), (0, 1)]
+NEGATIVE_ORTHOGONAL = [(-1, 0), (0, -1)]
+POSITIVE_DIAGONAL = [(1, 1), (1, -1)]
+NEGATIVE_DIAGONAL = [(-1, -1), (-1, 1)]
+
+
+def _on_board(r, c):
+    return 0 <= r < ROWS and 0 <= c < COLS
+
+
+def _step_table(deltas):
+    table = []
+    for sq in range(ROWS * COLS):
+        r, c = divmod(sq, COLS)
+        mask = 0
+        for dr, dc in deltas:
+            if _on_board(r + dr, c + dc):
+                mask |= 1 << ((r + dr) * COLS + c + dc)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr, dc):
+    table = []
+    for sq in range(ROWS * COLS):
+        r, c = divmod(sq, COLS)
+        mask = 0
+        r, c = r + dr, c + dc
+        while _on_board(r, c):
+            mask |= 1 << (r * COLS + c)
+            r, c = r + dr, c + dc
+        table.append(mask)
+    return table
+
+
+def _between_table():
+    table = [[0] * (ROWS * COLS) for _ in range(ROWS * COLS)]
+    for dr, dc in KING_DELTAS:
+        for start in range(ROWS * COLS):
+            r, c = divmod(start, COLS)
+            mask = 0
+            r, c = r + dr, c + dc
+            while _on_board(r, c):
+                table[start][r * COLS + c] = mask
+                mask |= 1 << (r * COLS + c)
+                r, c = r + dr, c + dc
+    return table
+
+
+KNIGHT_ATTACKS = _step_table(KNIGHT_DELTAS)
+KING_ATTACKS = _step_table(KING_DELTAS)
+# PAWN_ATTACKS[color][sq]: white pawns move towards row 0, black towards row 7.
+PAWN_ATTACKS = [_step_table([(-1, -1), (-1, 1)]), _step_table([(1, -1), (1, 1)])]
+
+POSITIVE_ROOK_RAYS = [_ray_table(dr, dc) for dr, dc in POSITIVE_ORTHOGONAL]
+NEGATIVE_ROOK_RAYS = [_ray_table(dr, dc) for dr, dc in NEGATIVE_ORTHOGONAL]
+POSITIVE_BISHOP_RAYS = [_ray_table(dr, dc) for dr, dc in POSITIVE_DIAGONAL]
+NEGATIVE_BISHOP_RAYS = [_ray_table(dr, dc) for dr, dc in NEGATIVE_DIAGONAL]
+
+ROOK_MASKS = [a | b | c | d for a, b, c, d in zip(*POSITIVE_ROOK_RAYS, *NEGATIVE_ROOK_RAYS)]
+BISHOP_MASKS = [a | b | c | d for a, b, c, d in zip(*POSITIVE_BISHOP_RAYS, *NEGATIVE_BISHOP_RAYS)]
+
+# BETWEEN[a][b]: squares strictly between a and b on a shared line, else 0.
+BETWEEN = _between_table()
+
+
+def _slide(sq, occupied, positive, negative):
+    attacks = 0
+    for rays in positive:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in negative:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def bishop_attacks(sq, occupied):
+    if not BISHOP_MASKS[sq] & occupied:
+        return BISHOP_MASKS[sq]
+    return _slide(sq, occupied, POSITIVE_BISHOP_RAYS, NEGATIVE_BISHOP_RAYS)
+
+
+def rook_attacks(sq, occupied):
+    if not ROOK_MASKS[sq] & occupied:
+        return ROOK_MASKS[sq]
+    return _slide(sq, occupied, POSITIVE_ROOK_RAYS, NEGATIVE_ROOK_RAYS)
+
+
+def queen_attacks(sq, occupied):
+    return bishop_attacks(sq, occupied) | rook_attacks(sq, occupied)
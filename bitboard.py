@@ -0,0 +1,285 @@
+from settings import ROWS, COLS
+from attacks import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+                     bishop_attacks, rook_attacks, queen_attacks)
+from zobrist import PIECE_KEYS, SIDE_KEY
+from heuristic import PIECE_SQUARE_VALUES
+
+WHITE, BLACK = 0, 1
+MAIN, TELEPORT = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+
+COLOR_NAMES = 'wb'
+TYPE_NAMES = ' pnbrqk'
+
+# Square 0 is the top-left corner (row 0, col 0) of the lists in settings,
+# so "north" (towards row 0, where white pawns go) is a right shift by 8.
+FULL = (1 << 64) - 1
+ROW_1 = 0xFF << 8
+ROW_6 = 0xFF << 48
+
+
+def make_piece(color, piece_type):
+    return color << 3 | piece_type
+
+
+def piece_code(name):
+    return make_piece(COLOR_NAMES.index(name[0]), TYPE_NAMES.index(name[1]))
+
+
+def piece_name(piece):
+    return COLOR_NAMES[piece >> 3] + TYPE_NAMES[piece & 7]
+
+
+PIECES = [make_piece(color, t) for color in (WHITE, BLACK) for t in range(PAWN, KING + 1)]
+
+
+def square(row, col):
+    return row * COLS + col
+
+
+def row_col(sq):
+    return divmod(sq, COLS)
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class Position:
+    __slots__ = ('pieces', 'occupied', 'squares', 'turn', 'key', 'score', 'kings', 'history')
+
+    def __init__(self, turn=WHITE):
+        # pieces[board][piece] is the occupancy of one piece code on one board,
+        # occupied[board][color] the union of that colour's sets.
+        self.pieces = [[0] * 15, [0] * 15]
+        self.occupied = [[0, 0], [0, 0]]
+        # squares[board << 6 | sq] is the piece code there, 0 when empty.
+        self.squares = bytearray(128)
+        self.turn = turn
+        # Zobrist key of both boards and the side to move, kept up to date by
+        # add_piece/remove_piece and make/unmake.
+        self.key = SIDE_KEY if turn else 0
+        # Material and piece-square score from white's point of view, kept
+        # up to date the same way (see heuristic.evaluate_position).
+        self.score = 0
+        # kings[color] is (board, square) of that king, or None.
+        self.kings = [None, None]
+        # Moves made so far, undone last first by unmake(). A move records
+        # its captured piece (see movegen), so nothing else needs saving.
+        self.history = []
+
+    def copy(self):
+        pos = Position(self.turn)
+        pos.pieces = [self.pieces[0][:], self.pieces[1][:]]
+        pos.occupied = [self.occupied[0][:], self.occupied[1][:]]
+        pos.squares = self.squares[:]
+        pos.key = self.key
+        pos.score = self.score
+        pos.kings = self.kings[:]
+        pos.history = self.history[:]
+        return pos
+
+    def make(self, move):
+        start = move & 63
+        end = move >> 6 & 63
+        board = move >> 12 & 1
+        piece = move >> 13 & 15
+        captured = move >> 17 & 15
+        remove_piece(self, board, start, piece)
+        if captured:
+            remove_piece(self, board, end, captured)
+        add_piece(self, board ^ 1, end, piece)
+        self.turn ^= 1
+        self.key ^= SIDE_KEY
+        self.history.append(move)
+
+    def unmake(self):
+        """Take back the last move made and return it."""
+        move = self.history.pop()
+        start = move & 63
+        end = move >> 6 & 63
+        board = move >> 12 & 1
+        piece = move >> 13 & 15
+        captured = move >> 17 & 15
+        self.turn ^= 1
+        self.key ^= SIDE_KEY
+        remove_piece(self, board ^ 1, end, piece)
+        if captured:
+            add_piece(self, board, end, captured)
+        add_piece(self, board, start, piece)
+        return move
+
+    def make_null(self):
+        """Pass the turn (for null-move pruning). Not recorded in history;
+        undo it with unmake_null() before unmaking any earlier move."""
+        self.turn ^= 1
+        self.key ^= SIDE_KEY
+
+    def unmake_null(self):
+        self.turn ^= 1
+        self.key ^= SIDE_KEY
+
+
+def add_piece(pos, board, sq, piece):
+    b = 1 << sq
+    pos.pieces[board][piece] |= b
+    pos.occupied[board][piece >> 3] |= b
+    pos.squares[board << 6 | sq] = piece
+    pos.key ^= PIECE_KEYS[board][piece][sq]
+    pos.score += PIECE_SQUARE_VALUES[piece][sq]
+    if piece & 7 == KING:
+        pos.kings[piece >> 3] = (board, sq)
+
+
+def remove_piece(pos, board, sq, piece):
+    b = 1 << sq
+    pos.pieces[board][piece] ^= b
+    pos.occupied[board][piece >> 3] ^= b
+    pos.squares[board << 6 | sq] = 0
+    pos.key ^= PIECE_KEYS[board][piece][sq]
+    pos.score -= PIECE_SQUARE_VALUES[piece][sq]
+    if piece & 7 == KING:
+        pos.kings[piece >> 3] = None
+
+
+def from_boards(board_main, board_teleport, turn='w'):
+    pos = Position(COLOR_NAMES.index(turn))
+    for board, rows in ((MAIN, board_main), (TELEPORT, board_teleport)):
+        for r in range(ROWS):
+            for c in range(COLS):
+                if rows[r][c]:
+                    add_piece(pos, board, square(r, c), piece_code(rows[r][c]))
+    return pos
+
+
+def to_boards(pos):
+    squares = pos.squares
+    return tuple([[piece_name(squares[board << 6 | square(r, c)]) if squares[board << 6 | square(r, c)] else None
+                   for c in range(COLS)] for r in range(ROWS)] for board in (MAIN, TELEPORT))
+
+
+def to_notation(pos):
+    """FEN-like text: main board, teleport board and side to move, e.g.
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 8/8/8/8/8/8/8/8 w'.
+    Ranks are listed from row 0; white pieces are upper case."""
+    fields = []
+    for rows in to_boards(pos):
+        ranks = []
+        for row in rows:
+            rank, empty = '', 0
+            for name in row:
+                if name is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank, empty = rank + str(empty), 0
+                rank += name[1].upper() if name[0] == 'w' else name[1]
+            ranks.append(rank + (str(empty) if empty else ''))
+        fields.append('/'.join(ranks))
+    fields.append(COLOR_NAMES[pos.turn])
+    return ' '.join(fields)
+
+
+def from_notation(text):
+    fields = text.split()
+    if len(fields) != 3 or fields[2] not in ('w', 'b'):
+        raise ValueError(f"Invalid position: {text!r}")
+    boards = []
+    for field in fields[:2]:
+        ranks = field.split('/')
+        if len(ranks) != ROWS:
+            raise ValueError(f"Invalid board: {field!r}")
+        rows = []
+        for rank in ranks:
+            row = []
+            for char in rank:
+                if char.isdigit():
+                    row.extend([None] * int(char))
+                elif char.lower() in TYPE_NAMES[1:]:
+                    row.append(('w' if char.isupper() else 'b') + char.lower())
+                else:
+                    raise ValueError(f"Invalid piece: {char!r}")
+            if len(row) != COLS:
+                raise ValueError(f"Invalid rank: {rank!r}")
+            rows.append(row)
+        boards.append(rows)
+    return from_boards(boards[0], boards[1], fields[2])
+
+
+def pack_position(pos):
+    """65 bytes: one nibble per square of both boards, then the side to move."""
+    data = bytearray(65)
+    squares = pos.squares
+    for index in range(0, 128, 2):
+        data[index >> 1] = squares[index] | squares[index + 1] << 4
+    data[64] = pos.turn
+    return bytes(data)
+
+
+def unpack_position(data):
+    pos = Position(data[64])
+    for index in range(128):
+        piece = data[index >> 1] >> ((index & 1) << 2) & 15
+        if piece:
+            add_piece(pos, index >> 6, index & 63, piece)
+    return pos
+
+
+def attacks_from(piece, sq, occupied):
+    t = piece & 7
+    if t == PAWN:
+        return PAWN_ATTACKS[piece >> 3][sq]
+    if t == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if t == BISHOP:
+        return bishop_attacks(sq, occupied)
+    if t == ROOK:
+        return rook_attacks(sq, occupied)
+    if t == QUEEN:
+        return queen_attacks(sq, occupied)
+    return KING_ATTACKS[sq]
+
+
+def move_targets(pos, board, sq, piece):
+    """Squares `piece` can reach from `sq` by the ordinary rules of `board`."""
+    color = piece >> 3
+    occupied = pos.occupied[board]
+    own = occupied[color]
+    enemy = occupied[color ^ 1]
+    if piece & 7 != PAWN:
+        return attacks_from(piece, sq, own | enemy) & ~own
+    # Pushes go north (towards row 0) for white, south for black.
+    empty = FULL ^ (own | enemy)
+    b = 1 << sq
+    if color == WHITE:
+        push = b >> 8 & empty
+        if b & ROW_6:
+            push |= push >> 8 & empty
+    else:
+        push = b << 8 & empty
+        if b & ROW_1:
+            push |= push << 8 & empty
+    return push | PAWN_ATTACKS[color][sq] & enemy
+
+
+def attackers_to(pos, board, sq, color):
+    pieces = pos.pieces[board]
+    occupied = pos.occupied[board][WHITE] | pos.occupied[board][BLACK]
+    base = color << 3
+    queens = pieces[base | QUEEN]
+    return (KNIGHT_ATTACKS[sq] & pieces[base | KNIGHT]
+            | KING_ATTACKS[sq] & pieces[base | KING]
+            | PAWN_ATTACKS[color ^ 1][sq] & pieces[base | PAWN]
+            | bishop_attacks(sq, occupied) & (pieces[base | BISHOP] | queens)
+            | rook_attacks(sq, occupied) & (pieces[base | ROOK] | queens))
+
+
+def is_in_check(pos, color):
+    king = pos.kings[color]
+    if king is None:
+        return False
+    board, sq = king
+    return bool(attackers_to(pos, board, sq, color ^ 1))
@@ -0,0 +1,171 @@
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from bitboard import from_notation
+from movegen import generate_moves, is_legal, move_from_text, move_to_text
+
+# Opening book file: an 8-byte header, then fixed-size entries sorted by
+# (key, move), so the entries of one position are adjacent and can be found
+# by binary search straight from the mapped file.
+#
+#   header: b'ALBK', version (u16), reserved (u16)
+#   entry:  Zobrist key (u64), encoded move (u32), weight (u16)
+#
+# Processes that open the same book share its pages through the OS cache.
+
+MAGIC = b'ALBK'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+ENTRY = struct.Struct('<QIH')
+MAX_WEIGHT = 0xFFFF
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+
+# Weight a book move gets per game, by the result for the side that played it.
+RESULT_WEIGHTS = {'win': 2, 'draw': 1, 'loss': 0}
+
+
+class OpeningBook:
+    """Read-only view of a book file; see write_book for the format."""
+
+    def __init__(self, path=DEFAULT_BOOK):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size or (size - HEADER.size) % ENTRY.size:
+                raise ValueError(f"{path}: not an opening book")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not an opening book (version {VERSION})")
+        self.size = (size - HEADER.size) // ENTRY.size
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self.data.close()
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)
+
+    def entries(self, key):
+        """[(move, weight)] stored for `key`, in file order."""
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            if self._entry(mid)[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        found = []
+        while low < self.size:
+            entry_key, move, weight = self._entry(low)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            low += 1
+        return found
+
+    def moves(self, pos):
+        """Book moves for `pos` with their weights, legal moves only."""
+        entries = self.entries(pos.key)
+        if not entries:
+            return []
+        # A key collision or a stale book must not produce an illegal move.
+        pseudo = set(generate_moves(pos))
+        return [(move, weight) for move, weight in entries if move in pseudo and is_legal(pos, move)]
+
+    def choose(self, pos, rng=random):
+        """A book move picked with probability proportional to its weight,
+        or None when the position is not in the book."""
+        moves = self.moves(pos)
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+
+_books = {}
+
+
+def get_book(path=DEFAULT_BOOK):
+    """The book at `path`, opened once per process; None if there is none."""
+    if path not in _books:
+        try:
+            _books[path] = OpeningBook(path)
+        except (OSError, ValueError):
+            _books[path] = None
+    return _books[path]
+
+
+def collect_moves(records, max_plies=16, weights=RESULT_WEIGHTS):
+    """Sum weights per (key, move) over the first `max_plies` moves of each
+    self-play record (see selfplay.play_game)."""
+    totals = {}
+    for record in records:
+        try:
+            pos = from_notation(record['start'])
+        except ValueError:
+            continue
+        result = record.get('result')
+        for text in record['moves'][:max_plies]:
+            move = move_from_text(pos, text)
+            if move is None or not is_legal(pos, move):
+                break
+            side = 'wb'[pos.turn]
+            if result == '1/2-1/2':
+                weight = weights['draw']
+            elif result == ('1-0' if side == 'w' else '0-1'):
+                weight = weights['win']
+            else:
+                weight = weights['loss']
+            totals[pos.key, move] = totals.get((pos.key, move), 0) + weight
+            pos.make(move)
+    return totals
+
+
+def write_book(path, totals, min_weight=1):
+    entries = sorted((key, move, min(weight, MAX_WEIGHT))
+                     for (key, move), weight in totals.items() if weight >= min_weight)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+    return len(entries)
+
+
+def read_records(paths):
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect an opening book.")
+    parser.add_argument('logs', nargs='*', help="self-play JSONL files to build the book from")
+    parser.add_argument('--output', default=DEFAULT_BOOK)
+    parser.add_argument('--max-plies', type=int, default=16, help="book moves taken from each game")
+    parser.add_argument('--min-weight', type=int, default=1)
+    parser.add_argument('--show', metavar='POSITION', help="list the book moves of a two-board position")
+    args = parser.parse_args(argv)
+
+    if args.show:
+        book = OpeningBook(args.output)
+        for move, weight in sorted(book.moves(from_notation(args.show)), key=lambda item: -item[1]):
+            print(f"{move_to_text(move)} {weight}")
+        return 0
+    if not args.logs:
+        parser.error("give at least one self-play log, or --show")
+    totals = collect_moves(read_records(args.logs), args.max_plies)
+    count = write_book(args.output, totals, args.min_weight)
+    print(f"{count} entries written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
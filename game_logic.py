@@ -1,4 +1,5 @@
 from settings import ROWS, COLS
+from attacks import KNIGHT_DELTAS, KING_DELTAS
 
 def is_valid_move(piece, start, end, board):
     if not piece:  
@@ -89,177 +90,57 @@ def find_king(board, color):
                 return row, col
     return None 
 
-def is_under_attack(board1, board2, position, attacker_color):
-    for board in (board1, board2):
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = board[row][col]
-                if piece and piece[0] == attacker_color:
-                    if is_valid_move(piece, (row, col), position, board):
-                        return True
-    return False
+def locate_king(board1, board2, color):
+    """Return (king_pos, king_board, other_board), scanning each board at
+    most once, or None when the king is on neither board."""
+    king_pos = find_king(board1, color)
+    if king_pos:
+        return king_pos, board1, board2
+    king_pos = find_king(board2, color)
+    if king_pos:
+        return king_pos, board2, board1
+    return None
+
+def find_attacker(board, position, attacker_color):
+    """Square of a piece of `attacker_color` attacking `position` on `board`.
+
+    Works outward from the target: knight and king patterns, the two pawn
+    squares and the first blocker on each ray. Under Alice rules a piece
+    only attacks along the board it stands on, so one board is enough.
+    """
+    tr, tc = position
+
+    for deltas, piece_type in ((KNIGHT_DELTAS, 'n'), (KING_DELTAS, 'k')):
+        for dr, dc in deltas:
+            r, c = tr + dr, tc + dc
+            if 0 <= r < ROWS and 0 <= c < COLS and board[r][c] == attacker_color + piece_type:
+                return r, c
+
+    # White pawns attack towards row 0, so they sit one row below the target.
+    r = tr + (1 if attacker_color == 'w' else -1)
+    if 0 <= r < ROWS:
+        for c in (tc - 1, tc + 1):
+            if 0 <= c < COLS and board[r][c] == attacker_color + 'p':
+                return r, c
+
+    for dr, dc in KING_DELTAS:
+        sliders = ('q', 'r') if dr == 0 or dc == 0 else ('q', 'b')
+        r, c = tr + dr, tc + dc
+        while 0 <= r < ROWS and 0 <= c < COLS:
+            piece = board[r][c]
+            if piece:
+                if piece[0] == attacker_color and piece[1] in sliders:
+                    return r, c
+                break
+            r, c = r + dr, c + dc
+
+    return None
 
 def is_in_check(board1, board2, color):
-    king_pos_main = find_king(board1, color)
-    king_pos_teleport = find_king(board2, color)
-
-    if king_pos_main:
-        king_pos = king_pos_main
-        active_board = board1
-    elif king_pos_teleport:
-        king_pos = king_pos_teleport
-        active_board = board2
-    else:
+    king = locate_king(board1, board2, color)
+    if not king:
         return False  
+    king_pos, active_board, _ = king
 
     opponent_color = 'b' if color == 'w' else 'w'
-
-    for row in range(ROWS):
-        for col in range(COLS):
-            piece = active_board[row][col]
-            if piece and piece[0] == opponent_color:
-                if is_valid_move(piece, (row, col), king_pos, active_board):
-                    return True
-
-    return False
-
-def get_attack_vector(attacker_row, attacker_col, king_pos, board):
-    king_row, king_col = king_pos
-    attack_vector = []
-
-    dr = king_row - attacker_row
-    dc = king_col - attacker_col
-
-    if dr == 0 or dc == 0 or abs(dr) == abs(dc):  
-        step_r = (dr // abs(dr)) if dr != 0 else 0
-        step_c = (dc // abs(dc)) if dc != 0 else 0
-
-        current_row, current_col = attacker_row + step_r, attacker_col + step_c
-        while (current_row, current_col) != (king_row, king_col):
-            attack_vector.append((current_row, current_col))
-            current_row += step_r
-            current_col += step_c
-
-    return attack_vector
-
-
-def can_escape_check(board1, board2, color):
-    king_pos_main = find_king(board1, color)
-    king_pos_teleport = find_king(board2, color)
-
-    if king_pos_main:
-        king_pos = king_pos_main
-        active_board = board1  
-        teleport_board = board2 
-    elif king_pos_teleport:
-        king_pos = king_pos_teleport
-        active_board = board2  
-        teleport_board = board1 
-    else:
-        return False  
-
-    opponent_color = 'b' if color == 'w' else 'w'
-
-    attacking_piece = None
-    for row in range(ROWS):
-        for col in range(COLS):
-            piece = active_board[row][col]
-            if piece and piece[0] == opponent_color:
-                if is_valid_move(piece, (row, col), king_pos, active_board):
-                    attacking_piece = (row, col)
-                    break
-        if attacking_piece:
-            break
-
-    if not attacking_piece:
-        return False  
-
-    attacker_row, attacker_col = attacking_piece
-    attack_vector = get_attack_vector(attacker_row, attacker_col, king_pos, active_board)
-
-    if attack_vector: 
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = teleport_board[row][col]
-                if piece and piece[0] == color:  
-                    for block_pos in attack_vector:
-                        if is_valid_move(piece, (row, col), block_pos, teleport_board):
-                            temp_board = [r[:] for r in active_board]
-                            temp_board[block_pos[0]][block_pos[1]] = piece  
-                            if not is_in_check(temp_board, teleport_board, color):
-                                return True 
-
-    return False 
-
-def is_checkmate(board1, board2, color):
-    if not is_in_check(board1, board2, color):
-        return False  
-
-    king_pos_main = find_king(board1, color)
-    king_pos_teleport = find_king(board2, color)
-
-    if king_pos_main:
-        king_pos = king_pos_main
-        active_board = board1
-        teleport_board = board2
-    elif king_pos_teleport:
-        king_pos = king_pos_teleport
-        active_board = board2
-        teleport_board = board1
-    else:
-        return False 
-
-    kr, kc = king_pos
-    opponent_color = 'b' if color == 'w' else 'w'
-
-    for dr in range(-1, 2):
-        for dc in range(-1, 2):
-            nr, nc = kr + dr, kc + dc
-            if 0 <= nr < ROWS and 0 <= nc < COLS:
-                if active_board[nr][nc] is None or active_board[nr][nc][0] == opponent_color:
-                    temp_board = [row[:] for row in active_board]
-                    temp_board[kr][kc] = None
-                    temp_board[nr][nc] = f"{color}k"
-                    if not is_in_check(temp_board, teleport_board, color):
-                        return False 
-
-    for row in range(ROWS):
-        for col in range(COLS):
-            piece = active_board[row][col]
-            if piece and piece[0] == color: 
-                for er in range(ROWS):
-                    for ec in range(COLS):
-                        if is_valid_move(piece, (row, col), (er, ec), active_board):
-                            temp_board = [r[:] for r in active_board]
-                            temp_board[row][col] = None
-                            temp_board[er][ec] = piece
-                            if not is_in_check(temp_board, teleport_board, color):
-                                return False 
-
-    if can_escape_check(board1, board2, color):
-        return False 
-
-    return True
-
-def move_piece_between_boards(start, end, board1, board2):
-    sr, sc = start
-    er, ec = end
-    piece = board1[sr][sc] if board1[sr][sc] else board2[sr][sc]
-
-    if piece:
-        if board1[sr][sc]:
-            source_board, target_board = board1, board2
-        else:
-            source_board, target_board = board2, board1
-
-        target_piece = target_board[er][ec]
-        if target_piece and target_piece[0] == piece[0]: 
-            return False
-
-        if is_valid_move(piece, start, end, source_board):
-            target_board[er][ec] = piece
-            source_board[sr][sc] = None
-            return True
-    return False
-
-
+    return find_attacker(active_board, king_pos, opponent_color) is not None
@@ -1,3 +1,94 @@
+PIECE_VALUES = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 1000}
+
+# Score of being mated at the root; mate in n plies scores MATE_SCORE - n.
+# Anything beyond MATE_THRESHOLD is a mate score rather than material.
+MATE_SCORE = 1000000
+MATE_THRESHOLD = MATE_SCORE - 1000
+DRAW_SCORE = 0
+
+# Piece-square tables in centipawns, written from white's side: the first
+# row is row 0 of the boards, where white pawns are heading. Black uses the
+# same tables flipped vertically. Both boards share them.
+PAWN_TABLE = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK_TABLE = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+]
+QUEEN_TABLE = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+]
+TABLES = {'p': PAWN_TABLE, 'n': KNIGHT_TABLE, 'b': BISHOP_TABLE,
+          'r': ROOK_TABLE, 'q': QUEEN_TABLE, 'k': KING_TABLE}
+
+
+def _piece_square_values():
+    # Indexed [piece code][square] like bitboard.Position.pieces; the value
+    # is material plus position, positive for white and negative for black.
+    values = [[0] * 64 for _ in range(15)]
+    for type_index, name in enumerate('pnbrqk', 1):
+        table = TABLES[name]
+        for sq in range(64):
+            row, col = divmod(sq, 8)
+            values[type_index][sq] = PIECE_VALUES[name] * 100 + table[sq]
+            values[8 | type_index][sq] = -(PIECE_VALUES[name] * 100 + table[(7 - row) * 8 + col])
+    return values
+
+
+PIECE_SQUARE_VALUES = _piece_square_values()
+
+
 def evaluate_board(board_main, board_teleport, current_turn):
     score = 0
     for board in [board_main, board_teleport]:
@@ -9,5 +100,21 @@ def evaluate_board(board_main, board_teleport, current_turn):
     return score
 
 def get_piece_value(piece):
-    values = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 1000}
-    return values.get(piece[1], 0)
+    return PIECE_VALUES.get(piece[1], 0)
+
+
+def evaluate_position(pos, color):
+    # pos.score is kept up to date by every add_piece/remove_piece, that is
+    # by Position.make/unmake, so a leaf costs nothing to evaluate.
+    return -pos.score if color else pos.score
+
+
+def compute_score(pos):
+    score = 0
+    for board in (0, 1):
+        for piece, bb in enumerate(pos.pieces[board]):
+            while bb:
+                low = bb & -bb
+                score += PIECE_SQUARE_VALUES[piece][low.bit_length() - 1]
+                bb ^= low
+    return score
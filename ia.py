@@ -1,106 +1,313 @@
 import math
-from game_logic import is_checkmate, is_valid_move, is_in_check
-from heuristic import evaluate_board
+import time
+from bitboard import KNIGHT, BISHOP, ROOK, QUEEN, is_in_check
+from movegen import generate_moves
+from heuristic import evaluate_position, MATE_SCORE, MATE_THRESHOLD, DRAW_SCORE
+from ordering import MoveOrderer, MAX_PLY
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from tablebase import probe_score
+from poscache import check_cache, leaves_in_check
 
-def minimax(board_main, board_teleport, depth, is_maximizing, alpha, beta, current_turn):
-    if depth == 0 or is_checkmate(board_main, board_teleport, current_turn):
-        return evaluate_board(board_main, board_teleport, current_turn)
+# Kept between ai_move calls; its size caps the memory the search can use.
+transposition_table = TranspositionTable()
+move_orderer = MoveOrderer()
 
-    moves = generate_all_moves(board_main, board_teleport, current_turn)
+# Wall-clock limit (time.perf_counter() value) of the running search, if any,
+# and a callable that returns True when the caller wants the search stopped.
+search_deadline = None
+search_stop = None
+nodes_searched = 0
+# Zobrist key -> move along the best line of the last completed iteration.
+previous_pv = {}
+# Print a line per completed iteration; headless runners turn this off.
+verbose = True
 
-    if is_maximizing:
-        max_eval = -math.inf
-        for move in moves:
-            if not validate_move(board_main, board_teleport, move, current_turn):
-                continue
-            make_move(board_main, board_teleport, move)
-            eval = minimax(board_main, board_teleport, depth - 1, False, alpha, beta, switch_turn(current_turn))
-            undo_move(board_main, board_teleport, move)
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval
-    else:
-        min_eval = math.inf
-        for move in moves:
-            if not validate_move(board_main, board_teleport, move, current_turn):
-                continue  
-            make_move(board_main, board_teleport, move)
-            eval = minimax(board_main, board_teleport, depth - 1, True, alpha, beta, switch_turn(current_turn))
-            undo_move(board_main, board_teleport, move)
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval
+# Null-move pruning: minimum remaining depth and how much shallower the
+# search after passing is (one ply more from depth 6).
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+# Late-move reductions apply from this depth to quiet moves tried after this
+# many others; from depth 6, moves after twice as many lose two plies.
+LMR_MIN_DEPTH = 4
+LMR_MIN_MOVES = 3
+# Half-width of the window around the previous iteration's score, in the
+# units of heuristic.evaluate_position; doubled after every failure, and
+# opened fully on the failing side after the third.
+ASPIRATION_WINDOW = 50
 
 
-def generate_all_moves(board_main, board_teleport, current_turn):
-    moves = []
+class SearchTimeout(Exception):
+    pass
 
-    for r, row in enumerate(board_main):
-        for c, piece in enumerate(row):
-            if piece and piece[0] == current_turn:
-                moves.extend(generate_piece_moves((r, c), piece, board_main, board_teleport))
 
-    for r, row in enumerate(board_teleport):
-        for c, piece in enumerate(row):
-            if piece and piece[0] == current_turn:
-                moves.extend(generate_piece_moves((r, c), piece, board_teleport, board_main))
+def new_game():
+    # Forget everything learned from earlier games.
+    global move_orderer
+    transposition_table.clear()
+    move_orderer = MoveOrderer()
 
-    return moves
 
+def negamax(pos, depth, alpha, beta, ply=1, stats=None, null_ok=True):
+    """Score of `pos` from the side to move's point of view, searched with
+    principal variation search: the first move gets the full window, the
+    rest a zero window that is widened only when they beat alpha."""
+    global nodes_searched
+    nodes_searched += 1
+    if nodes_searched & 1023 == 0 and search_interrupted():
+        raise SearchTimeout()
 
-def generate_piece_moves(position, piece, source_board, target_board):
-    moves = []
-    r, c = position
+    # Positions covered by an endgame table have an exact score.
+    score = probe_score(pos, ply)
+    if score is not None:
+        if stats is not None:
+            stats.nodes += 1
+            stats.tablebase_hits += 1
+        return score
 
-    def add_move(target_board, sr, sc, er, ec):
-        if 0 <= er < len(target_board) and 0 <= ec < len(target_board[0]):
-            if target_board[er][ec] is None: 
-                moves.append((source_board, target_board, (sr, sc), (er, ec)))
+    if depth <= 0:
+        if stats is not None:
+            stats.nodes += 1
+            stats.leaf_evaluations += 1
+            started = time.perf_counter()
+            score = evaluate_position(pos, pos.turn)
+            stats.add_time('evaluate', time.perf_counter() - started)
+            return score
+        return evaluate_position(pos, pos.turn)
+    if stats is not None:
+        stats.nodes += 1
 
-    for er in range(len(target_board)):
-        for ec in range(len(target_board[0])):
-            add_move(target_board, r, c, er, ec)
+    score, hash_move = transposition_table.probe(pos.key, depth, alpha, beta, ply)
+    if score is not None:
+        return score
+    hash_move = previous_pv.get(pos.key, hash_move)
+    if stats is not None:
+        stats.check_calls += 1
+    in_check = is_in_check(pos, pos.turn)
+    pv_node = beta - alpha > 1
 
-    return moves
+    # Null move: if passing still fails high, a real move will too. Not in
+    # check (passing would be illegal), not twice in a row, and only with a
+    # piece besides pawns and the king, since pawn endings are where having
+    # to move can be a disadvantage (zugzwang).
+    if (null_ok and not pv_node and not in_check and depth >= NULL_MOVE_MIN_DEPTH
+            and has_pieces(pos, pos.turn) and evaluate_position(pos, pos.turn) >= beta):
+        reduction = NULL_MOVE_REDUCTION + (depth >= 6)
+        pos.make_null()
+        score = -negamax(pos, depth - 1 - reduction, -beta, -beta + 1, ply + 1, stats, False)
+        pos.unmake_null()
+        if score >= beta:
+            # A mate found after passing proves nothing about the real moves.
+            return beta if score > MATE_THRESHOLD else score
 
+    original_alpha = alpha
+    killers = move_orderer.killers[ply] if ply < MAX_PLY else (None, None)
+    best_move = None
+    best_eval = -math.inf
+    tried = 0
 
-def validate_move(board_main, board_teleport, move, current_turn):
-    source_board, target_board, start, end = move
-    piece = source_board[start[0]][start[1]]
+    for move in move_orderer.staged(pos, ply, hash_move, stats):
+        if not validate_move(pos, move, stats):
+            continue
+        pos.make(move)
+        if best_move is None:
+            eval = -negamax(pos, depth - 1, -beta, -alpha, ply + 1, stats)
+        else:
+            # Late quiet moves are searched shallower first; captures,
+            # killers, check evasions and checks are never reduced.
+            reduction = 0
+            if (depth >= LMR_MIN_DEPTH and tried >= LMR_MIN_MOVES and not in_check
+                    and not move >> 17 and move not in killers):
+                if stats is not None:
+                    stats.check_calls += 1
+                if not is_in_check(pos, pos.turn):
+                    reduction = 2 if depth >= 6 and tried >= 2 * LMR_MIN_MOVES else 1
+            eval = -negamax(pos, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1, stats)
+            if eval > alpha and reduction:
+                eval = -negamax(pos, depth - 1, -alpha - 1, -alpha, ply + 1, stats)
+            if alpha < eval < beta:
+                eval = -negamax(pos, depth - 1, -beta, -alpha, ply + 1, stats)
+        pos.unmake()
+        if eval > best_eval:
+            best_eval = eval
+            best_move = move
+        if eval > alpha:
+            alpha = eval
+            if alpha >= beta:
+                move_orderer.record_cutoff(move, ply, depth, tried)
+                if stats is not None:
+                    stats.add_cutoff(tried)
+                break
+        tried += 1
 
-    if not is_valid_move(piece, start, end, source_board):
-        return False
+    if best_move is None:
+        # No legal move: mate if in check, otherwise stalemate.
+        return -(MATE_SCORE - ply) if in_check else DRAW_SCORE
 
-    make_move(board_main, board_teleport, move)
-    in_check = is_in_check(board_main, board_teleport, current_turn)
-    undo_move(board_main, board_teleport, move)
+    if best_eval <= original_alpha:
+        flag = UPPER
+    elif best_eval >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    transposition_table.store(pos.key, depth, flag, best_eval, best_move, ply)
+    return best_eval
 
-    return not in_check
 
+def has_pieces(pos, color):
+    """Whether `color` has a knight, bishop, rook or queen on either board."""
+    base = color << 3
+    for pieces in pos.pieces:
+        if pieces[base | KNIGHT] | pieces[base | BISHOP] | pieces[base | ROOK] | pieces[base | QUEEN]:
+            return True
+    return False
 
-def make_move(board_main, board_teleport, move):
-    source_board, target_board, start, end = move
-    piece = source_board[start[0]][start[1]]
-    source_board[start[0]][start[1]] = None
-    target_board[end[0]][end[1]] = piece
 
+def search_interrupted():
+    if search_deadline is not None and time.perf_counter() > search_deadline:
+        return True
+    return search_stop is not None and search_stop()
 
-def undo_move(board_main, board_teleport, move):
-    source_board, target_board, start, end = move
-    sr, sc = start
-    er, ec = end
 
-    piece = target_board[er][ec]
-    target_board[er][ec] = None
-    source_board[sr][sc] = piece
+def find_best_move(pos, depth, stats=None, alpha=-math.inf, beta=math.inf):
+    """Return (move, score) of the root searched to `depth` inside
+    (alpha, beta). A score at or outside the window is only a bound."""
+    best_move = None
+    best_eval = -math.inf
+    original_alpha = alpha
+    transposition_table.new_search()
+    if stats is not None:
+        started = time.perf_counter()
+        probes, hits = transposition_table.probes, transposition_table.hits
+        check_probes, check_hits = check_cache.probes, check_cache.hits
+    _, hash_move = transposition_table.probe(pos.key, depth, -math.inf, math.inf)
+    hash_move = previous_pv.get(pos.key, hash_move)
 
+    try:
+        for move in move_orderer.order(generate_moves(pos), 0, hash_move):
+            if not validate_move(pos, move, stats):
+                continue
+            pos.make(move)
+            if best_move is None:
+                eval = -negamax(pos, depth - 1, -beta, -alpha, stats=stats)
+            else:
+                eval = -negamax(pos, depth - 1, -alpha - 1, -alpha, stats=stats)
+                if alpha < eval < beta:
+                    eval = -negamax(pos, depth - 1, -beta, -alpha, stats=stats)
+            pos.unmake()
 
-def switch_turn(current_turn):
-    return 'b' if current_turn == 'w' else 'w'
+            if best_move is None or eval > best_eval:
+                best_eval = eval
+                best_move = move
+            alpha = max(alpha, eval)
+            if alpha >= beta:
+                break
+    finally:
+        # An aborted iteration still counts towards the totals.
+        if stats is not None:
+            stats.add_cache('transposition', transposition_table.probes - probes,
+                            transposition_table.hits - hits)
+            stats.add_cache('check', check_cache.probes - check_probes, check_cache.hits - check_hits)
+            stats.add_time('search', time.perf_counter() - started)
 
+    if best_move is not None:
+        if best_eval <= original_alpha:
+            flag = UPPER
+        elif best_eval >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        transposition_table.store(pos.key, depth, flag, best_eval, best_move)
+    return best_move, best_eval
 
 
+def aspiration_search(pos, depth, previous_eval, stats=None):
+    """find_best_move with a narrow window around the previous iteration's
+    score, widened on the failing side until the score falls inside it."""
+    if depth < 3 or abs(previous_eval) > MATE_THRESHOLD:
+        return find_best_move(pos, depth, stats)
+    window = ASPIRATION_WINDOW
+    alpha, beta = previous_eval - window, previous_eval + window
+    while True:
+        move, eval = find_best_move(pos, depth, stats, alpha, beta)
+        if move is None or alpha < eval < beta:
+            return move, eval
+        window *= 2
+        if eval <= alpha:
+            alpha = -math.inf if window >= 8 * ASPIRATION_WINDOW else eval - window
+        else:
+            beta = math.inf if window >= 8 * ASPIRATION_WINDOW else eval + window
+
+
+def iterative_deepening(pos, time_ms, max_depth=32, on_progress=None, should_stop=None, stats=None):
+    """Search depth 1, 2, ... until `time_ms` runs out and return the
+    (move, score, depth) of the last iteration that completed.
+
+    `on_progress(depth, nodes, score, move)` is called after every completed
+    iteration; `should_stop()` is polled during the search and aborts it.
+    A `stats.SearchStats` passed as `stats` collects counters and timings.
+    """
+    global search_deadline, search_stop, nodes_searched
+    start = time.perf_counter()
+    deadline = start + time_ms / 1000
+    nodes_searched = 0
+    previous_pv.clear()
+    move_orderer.new_search()
+    best_move, best_eval, completed = None, -math.inf, 0
+
+    for depth in range(1, max_depth + 1):
+        # Depth 1 always runs to the end so there is a move to play.
+        search_deadline = deadline if depth > 1 else None
+        search_stop = should_stop
+        try:
+            # An aborted iteration leaves moves made on the copy, not on pos.
+            move, eval = aspiration_search(pos.copy(), depth, best_eval, stats)
+        except SearchTimeout:
+            break
+        finally:
+            search_deadline = None
+            search_stop = None
+        if move is None:
+            break
+        best_move, best_eval, completed = move, eval, depth
+        previous_pv.clear()
+        line_pos = pos.copy()
+        for pv_move in principal_variation(pos, depth):
+            previous_pv[line_pos.key] = pv_move
+            line_pos.make(pv_move)
+        if verbose:
+            cutoffs = move_orderer.cutoff_stats()
+            print(f"Profundidad {depth}: {eval} ({nodes_searched} nodos, "
+                  f"{cutoffs['first_move_rate']:.0%} cortes con la 1a jugada, "
+                  f"{time.perf_counter() - start:.2f}s)")
+        if on_progress is not None:
+            on_progress(depth, nodes_searched, eval, move)
+        # The next iteration costs several times this one; do not start it
+        # unless it has a realistic chance to finish.
+        if time.perf_counter() - start > (time_ms / 1000) / 2:
+            break
+
+    return best_move, best_eval, completed
+
+
+def principal_variation(pos, depth):
+    line = []
+    pos = pos.copy()
+    for _ in range(depth):
+        _, move = transposition_table.probe(pos.key, 0, -math.inf, math.inf)
+        if move is None or move not in generate_moves(pos) or not validate_move(pos, move):
+            break
+        line.append(move)
+        pos.make(move)
+    return line
+
+
+def validate_move(pos, move, stats=None):
+    if stats is None:
+        return not leaves_in_check(pos, move)
+    started = time.perf_counter()
+    hits = check_cache.hits
+    in_check = leaves_in_check(pos, move)
+    # Only a cache miss actually runs is_in_check.
+    stats.check_calls += check_cache.hits == hits
+    stats.add_time('validate', time.perf_counter() - started)
+    return not in_check
@@ -1,88 +1,167 @@
-import math
-from queue import PriorityQueue
-from game_logic import is_valid_move, is_in_check, can_escape_check, find_king, move_piece_between_boards
-from heuristic import evaluate_board
-
-
-def busqueda_greedy(board_main, board_teleport, max_moves, current_turn):
-    best_move = None
-    best_score = -math.inf if current_turn == 'b' else math.inf 
-
-    all_moves = generate_all_moves(board_main, board_teleport, current_turn)
-
-    for move in all_moves:
-        source_board, target_board, start, end = move
-        piece = source_board[start[0]][start[1]]
-
-        if not is_valid_move(piece, start, end, source_board):
-            continue
-
-        make_move(board_main, board_teleport, move)
-
-        if is_in_check(board_main, board_teleport, current_turn):
-            undo_move(board_main, board_teleport, move)
-            continue
-
-        score = evaluate_board(board_main, board_teleport, current_turn)
-
-        undo_move(board_main, board_teleport, move)
-
-        if (current_turn == 'b' and score > best_score) or (current_turn == 'w' and score < best_score):
-            best_score = score
-            best_move = move
-
-    return (best_move, best_score) if best_move else None
-
-
-def generate_all_moves(board_main, board_teleport, current_turn):
-    moves = []
-
-    for r, row in enumerate(board_main):
-        for c, piece in enumerate(row):
-            if piece and piece[0] == current_turn:
-                moves.extend(generate_piece_moves((r, c), piece, board_main, board_teleport))
-
-    for r, row in enumerate(board_teleport):
-        for c, piece in enumerate(row):
-            if piece and piece[0] == current_turn:
-                moves.extend(generate_piece_moves((r, c), piece, board_teleport, board_main))
-
-    return moves
-
-
-def generate_piece_moves(position, piece, source_board, target_board):
-    moves = []
-    r, c = position
-
-    def add_move(target_board, sr, sc, er, ec):
-        if 0 <= er < len(target_board) and 0 <= ec < len(target_board[0]):
-            if target_board[er][ec] is None:  
-                moves.append((source_board, target_board, (sr, sc), (er, ec)))
-
-    for er in range(len(target_board)):
-        for ec in range(len(target_board[0])):
-            add_move(target_board, r, c, er, ec)
-
-    return moves
-
-
-
-def make_move(board_main, board_teleport, move):
-
-    source_board, target_board, start, end = move
-    piece = source_board[start[0]][start[1]]
-    source_board[start[0]][start[1]] = None
-    target_board[end[0]][end[1]] = piece
-
-
-def undo_move(board_main, board_teleport, move):
-    source_board, target_board, start, end = move
-    sr, sc = start
-    er, ec = end
-
-    piece = target_board[er][ec]
-    target_board[er][ec] = None
-    source_board[sr][sc] = piece
-
-
-
+import argparse
+import random
+import sys
+import time
+import timeit
+from bitboard import from_notation
+from heuristic import PIECE_SQUARE_VALUES
+from movegen import generate_moves, is_legal
+from poscache import check_cache, leaves_in_check
+
+# With fewer candidates than this, plain Python scores them faster than
+# the NumPy call does; `python ia_greed.py --bench` measures the crossover
+# (56 to 64 moves here, so most real positions stay in Python).
+NUMPY_MIN_MOVES = 56
+
+# NumPy is optional and slow to import, so it is loaded on first use;
+# False once the import has failed.
+_numpy = None
+_piece_square_array = None
+
+
+def _load_numpy():
+    global _numpy, _piece_square_array
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            _numpy = False
+        else:
+            _numpy = numpy
+            _piece_square_array = numpy.array(PIECE_SQUARE_VALUES, dtype=numpy.int32).ravel()
+    return _numpy or None
+
+
+def score_moves(pos, moves, use_numpy=None):
+    """pos.score (white's point of view) after each of `moves`, worked out
+    from the moved and captured pieces without making the moves.
+
+    `use_numpy` forces (True) or avoids (False) the NumPy path; by default
+    it is taken from NUMPY_MIN_MOVES moves on, when NumPy is installed.
+    """
+    if use_numpy is None:
+        use_numpy = len(moves) >= NUMPY_MIN_MOVES
+    numpy = _load_numpy() if use_numpy else None
+    if numpy is not None:
+        encoded = numpy.array(moves, dtype=numpy.int64)
+        start = encoded & 63
+        end = encoded >> 6 & 63
+        piece = (encoded >> 13 & 15) * 64
+        captured = (encoded >> 17 & 15) * 64
+        values = _piece_square_array
+        return (pos.score - values[piece + start] + values[piece + end]
+                - values[captured + end]).tolist()
+    score = pos.score
+    values = PIECE_SQUARE_VALUES
+    return [score - values[move >> 13 & 15][move & 63] + values[move >> 13 & 15][move >> 6 & 63]
+            - values[move >> 17 & 15][move >> 6 & 63] for move in moves]
+
+
+def busqueda_greedy(pos, max_moves, stats=None):
+    sign = -1 if pos.turn else 1
+
+    if stats is not None:
+        started = time.perf_counter()
+    moves = generate_moves(pos)
+    if stats is not None:
+        generated = time.perf_counter()
+        stats.add_time('generate', generated - started)
+
+    # Score every candidate at once, then check legality best first: the
+    # first legal move is the answer, and most moves are never made.
+    scores = [sign * score for score in score_moves(pos, moves)]
+    order = sorted(range(len(moves)), key=lambda i: -scores[i])
+    if stats is not None:
+        stats.leaf_evaluations += len(moves)
+        stats.add_time('evaluate', time.perf_counter() - generated)
+        probes, hits = check_cache.probes, check_cache.hits
+
+    result = None
+    for i in order:
+        move = moves[i]
+        if stats is not None:
+            stats.nodes += 1
+        if not leaves_in_check(pos, move):
+            result = move, scores[i]
+            break
+
+    if stats is not None:
+        # Only the cache misses actually ran is_in_check.
+        stats.check_calls += (check_cache.probes - probes) - (check_cache.hits - hits)
+        stats.add_cache('check', check_cache.probes - probes, check_cache.hits - hits)
+        stats.add_time('search', time.perf_counter() - started)
+    return result
+
+
+def sample_positions(count, seed=0, max_plies=30):
+    """Positions from random games started at the perft reference
+    positions, for --check and --bench."""
+    from perft import REFERENCE_POSITIONS
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        _, position, _ = rng.choice(REFERENCE_POSITIONS)
+        pos = from_notation(position)
+        for _ in range(rng.randrange(max_plies)):
+            legal = [move for move in generate_moves(pos) if is_legal(pos, move)]
+            if not legal:
+                break
+            pos.make(rng.choice(legal))
+        positions.append(pos)
+    return positions
+
+
+def check_numpy(positions):
+    """Number of positions where the NumPy and Python paths of
+    score_moves disagree."""
+    mismatches = 0
+    for pos in positions:
+        moves = generate_moves(pos)
+        mismatches += score_moves(pos, moves, True) != score_moves(pos, moves, False)
+    return mismatches
+
+
+def bench_numpy(positions, sizes):
+    """(size, NumPy microseconds, Python microseconds) per call of
+    score_moves on move lists of each size."""
+    moves = [move for pos in positions for move in generate_moves(pos)]
+    pos = positions[0]
+    results = []
+    for size in sizes:
+        batch = moves[:size]
+        timings = [min(timeit.repeat(lambda: score_moves(pos, batch, flag), number=500, repeat=5)) / 500 * 1e6
+                   for flag in (True, False)]
+        results.append((size, *timings))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or time the NumPy path of the greedy player.")
+    parser.add_argument('--check', action='store_true', help="compare the NumPy and Python scores")
+    parser.add_argument('--bench', action='store_true', help="time both paths by number of candidates")
+    parser.add_argument('--positions', type=int, default=300)
+    args = parser.parse_args(argv)
+    if not (args.check or args.bench):
+        parser.error("nothing to do: pass --check and/or --bench")
+    if _load_numpy() is None:
+        print("NumPy is not installed")
+        return 1
+
+    positions = sample_positions(args.positions)
+    if args.check:
+        mismatches = check_numpy(positions)
+        print(f"{len(positions)} positions: {'OK' if not mismatches else f'{mismatches} mismatches'}")
+        if mismatches:
+            return 1
+    if args.bench:
+        crossover = None
+        for size, numpy_us, python_us in bench_numpy(positions, range(8, 129, 8)):
+            print(f"{size:4d} moves: NumPy {numpy_us:6.1f} us, Python {python_us:6.1f} us")
+            if crossover is None and numpy_us < python_us:
+                crossover = size
+        print(f"NumPy is faster from {crossover} moves" if crossover else "NumPy is never faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules headless tools (search worker, self-play, engine server, perft)
+# import. None of them may pull in pygame.
+ENGINE_MODULES = ['worker', 'selfplay', 'server', 'perft', 'parallel']
+IMPORT_BUDGET_MS = 150
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print((time.perf_counter() - start) * 1000)
+print(int(any(m == 'pygame' or m.startswith('pygame.') for m in sys.modules)))
+"""
+
+
+def measure(modules=ENGINE_MODULES, runs=5):
+    """Best-of-`runs` import time in ms of `modules` in a fresh interpreter,
+    and whether any run loaded pygame."""
+    best, loaded_pygame = None, False
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE, *modules],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        elapsed = float(output[0])
+        best = elapsed if best is None else min(best, elapsed)
+        loaded_pygame |= output[1] == '1'
+    return best, loaded_pygame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the engine import-time budget.")
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help="milliseconds")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    elapsed, loaded_pygame = measure(runs=args.runs)
+    print(f"Import of {', '.join(ENGINE_MODULES)}: {elapsed:.1f} ms (budget {args.budget:.0f} ms)")
+    if loaded_pygame:
+        print("FAIL: pygame was imported")
+        return 1
+    if elapsed > args.budget:
+        print("FAIL: over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
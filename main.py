@@ -1,16 +1,20 @@
-import math
 import pygame
 import sys
-from ia_greed import busqueda_greedy
-from ia import generate_piece_moves, minimax, undo_move
+from bitboard import MAIN
+from movegen import move_squares
 from settings import SECOND_BOARD, SQUARE_SIZE, WIDTH, HEIGHT, INITIAL_BOARD
-from tablero import draw_boards, load_images
-from pieces import draw_pieces_on_boards
-from game_logic import find_king, is_in_check, is_valid_move
+from worker import SearchWorker
+from sprites import load_images
+from tablero import draw_boards
+from pieces import draw_changed_squares, draw_pieces_on_boards
+from game_logic import is_in_check, is_valid_move
 
 
 use_greedy_search = True
 
+# How often the loop wakes up to poll the search worker while it thinks.
+AI_POLL_MS = 50
+
 def move_piece(start, end, source_board, target_board, check_turn=True):
     """Move the piece on the board, capture enemy pieces, and teleport to the other board."""
     global current_turn
@@ -37,20 +41,20 @@ def move_piece(start, end, source_board, target_board, check_turn=True):
             print(f"El cuadro {end} no esta vacio!")
             return False
         
+        # Try the move in place, capture included, as Position.make does,
+        # and take it back if it leaves the king in check.
+        captured = source_board[er][ec]
         source_board[sr][sc] = None
+        source_board[er][ec] = None
+        target_board[er][ec] = piece
 
-        temp_source_board = [row[:] for row in source_board]
-        temp_target_board = [row[:] for row in target_board]
-        temp_target_board[er][ec] = piece
-
-        if is_in_check(temp_source_board, temp_target_board, current_turn):
+        if is_in_check(source_board, target_board, current_turn):
             print("El rey esta en check!")
+            target_board[er][ec] = None
+            source_board[er][ec] = captured
             source_board[sr][sc] = piece
             return False
 
-        source_board[er][ec] = None 
-        target_board[er][ec] = piece
-
         current_turn = 'b' if current_turn == 'w' else 'w'
         return True
     else:
@@ -59,67 +63,24 @@ def move_piece(start, end, source_board, target_board, check_turn=True):
 
 
 
-def ai_move(board_main, board_teleport):
+def ai_move(board_main, board_teleport, best_move):
+    """Play the move the search worker picked for black."""
     global current_turn, use_greedy_search
 
-    print("Pensando")
-    depth = 2 
-    if use_greedy_search:
-        print("Usando avara.")
-        greedy_result = busqueda_greedy(board_main, board_teleport, 50, 'b')
-        if greedy_result:
-            best_move, _ = greedy_result 
-            if best_move:
-                start, end = best_move[2], best_move[3] 
-                source_board, target_board = best_move[0], best_move[1]
-                if is_valid_move(source_board[start[0]][start[1]], start, end, source_board):
-                    move_piece(start, end, source_board, target_board, check_turn=False)
-        else:
-            print("No encontro movimiento.")
-
-    else:
-        print("Usando Minimax...")
-        best_move = None
-        best_eval = -math.inf
-
-        moves = []
-        for r, row in enumerate(board_main):
-            for c, piece in enumerate(row):
-                if piece and piece[0] == 'b':  
-                    possible_moves = generate_piece_moves((r, c), piece, board_main, board_teleport)
-                    for move in possible_moves:
-                        source_board, target_board, start, end = move
-                        if is_valid_move(piece, start, end, source_board): 
-                            if target_board[end[0]][end[1]] is None:
-                                moves.append(move)
-
-        for r, row in enumerate(board_teleport):
-            for c, piece in enumerate(row):
-                if piece and piece[0] == 'b': 
-                    possible_moves = generate_piece_moves((r, c), piece, board_teleport, board_main)
-                    for move in possible_moves:
-                        source_board, target_board, start, end = move
-                        if is_valid_move(piece, start, end, source_board): 
-                            if target_board[end[0]][end[1]] is None:
-                                moves.append(move)
-
-        for move in moves:
-            source_board, target_board, start, end = move
-            if move_piece(start, end, source_board, target_board, check_turn=False):
-                eval = minimax(board_main, board_teleport, depth - 1, False, -math.inf, math.inf, 'w')
-                undo_move(board_main, board_teleport, move)
-
-                if eval > best_eval:
-                    best_eval = eval
-                    best_move = move
-            
-
-        if best_move:
-            source_board, target_board, start, end = best_move
-            move_piece(start, end, source_board, target_board, check_turn=False)
-
     use_greedy_search = not use_greedy_search
-    current_turn = 'w' 
+    if best_move is None:
+        print("No encontro movimiento.")
+        current_turn = 'w'
+        return
+
+    board, start, end = move_squares(best_move)
+    if board == MAIN:
+        moved = move_piece(start, end, board_main, board_teleport, check_turn=False)
+    else:
+        moved = move_piece(start, end, board_teleport, board_main, check_turn=False)
+    # A rejected move keeps the turn, so the next poll searches again.
+    if moved:
+        current_turn = 'w'
 
 
 
@@ -128,10 +89,16 @@ def ai_move(board_main, board_teleport):
 
 
 def main():
+    def show_progress(depth, nodes):
+        pygame.display.set_caption(f"Alicia's Chess Game - pensando: profundidad {depth}, {nodes} nodos")
+
+    # The engine runs in its own process, started before SDL is initialised;
+    # the loop below only polls it.
+    worker = SearchWorker(on_progress=show_progress)
+
     pygame.init()
     screen = pygame.display.set_mode((WIDTH * 2 + 50, HEIGHT + 50))
     pygame.display.set_caption("Alicia's Chess Game")
-    clock = pygame.time.Clock()
     font = pygame.font.Font(None, 36)
 
     images = load_images()
@@ -146,10 +113,38 @@ def main():
     board_main = [row[:] for row in INITIAL_BOARD]
     board_teleport = [row[:] for row in SECOND_BOARD]
 
+    # What is currently on screen, so only changed squares get redrawn.
+    drawn = None
+
     while running:
-        for event in pygame.event.get():
+        if drawn is None:
+            screen.fill((0, 0, 0))  # Clear the screen
+
+            # Draw the main board
+            draw_boards(screen, offset=0)
+
+            # Draw the teleport board with an offset
+            draw_boards(screen, offset=WIDTH + 20)
+
+            # Draw pieces
+            draw_pieces_on_boards(screen, images, board_main, board_teleport)
+            drawn = ([row[:] for row in board_main], [row[:] for row in board_teleport])
+
+            pygame.display.flip()
+
+        # Sleep until something happens; while the engine thinks, wake up
+        # regularly to poll it.
+        if current_turn == 'b' or worker.busy:
+            events = [pygame.event.wait(AI_POLL_MS)]
+        else:
+            events = [pygame.event.wait()]
+        events += pygame.event.get()
+
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                drawn = None
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if current_turn == 'w':  # Only allow interaction during the player's turn
                     mouse_x, mouse_y = pygame.mouse.get_pos()
@@ -183,22 +178,20 @@ def main():
                             print(f"Es el turno de {'Blancas' if current_turn == 'w' else 'Negras'}")
 
         if current_turn == 'b':  # AI's turn
-            ai_move(board_main, board_teleport)
-
-        screen.fill((0, 0, 0))  # Clear the screen
-
-        # Draw the main board
-        draw_boards(screen, offset=0)
-
-        # Draw the teleport board with an offset
-        draw_boards(screen, offset=WIDTH + 20)
-
-        # Draw pieces
-        draw_pieces_on_boards(screen, images, board_main, board_teleport)
-
-        pygame.display.flip()
-        clock.tick(60)
-
+            if not worker.busy:
+                print("Pensando")
+                worker.start(board_main, board_teleport, 'b', use_greedy_search)
+            result = worker.poll()
+            if result:
+                pygame.display.set_caption("Alicia's Chess Game")
+                ai_move(board_main, board_teleport, result[1])
+
+        if drawn is not None:
+            dirty = draw_changed_squares(screen, images, board_main, board_teleport, drawn)
+            if dirty:
+                pygame.display.update(dirty)
+
+    worker.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,140 @@
+from bitboard import (WHITE, BLACK, MAIN, TELEPORT, PAWN, KING,
+                      move_targets, iter_bits, row_col, is_in_check)
+from settings import ROWS
+from zobrist import PIECE_KEYS, SIDE_KEY
+
+# A move is a plain int:
+#   bits 0-5   start square        bits 6-11  end square
+#   bit  12    source board        bits 13-16 moving piece
+#   bits 17-20 captured piece (0 when the move is quiet)
+
+
+def move_start(move):
+    return move & 63
+
+
+def move_end(move):
+    return move >> 6 & 63
+
+
+def move_board(move):
+    return move >> 12 & 1
+
+
+def move_squares(move):
+    """Source board index and (row, col) start/end squares of `move`."""
+    return move_board(move), row_col(move_start(move)), row_col(move_end(move))
+
+
+def square_name(sq):
+    row, col = row_col(sq)
+    return 'abcdefgh'[col] + str(ROWS - row)
+
+
+def move_to_text(move):
+    """'M' or 'T' for the source board, then start and end square: 'Me2e4'."""
+    return 'MT'[move_board(move)] + square_name(move_start(move)) + square_name(move_end(move))
+
+
+def move_from_text(pos, text):
+    """The pseudo-legal move of the side to move written as `text`, or None."""
+    for move in generate_moves(pos):
+        if move_to_text(move) == text:
+            return move
+    return None
+
+
+def piece_targets(pos, board, sq, piece):
+    """(quiet, captures) target sets of one piece: the squares
+    bitboard.move_targets gives on `board` that are also empty on the other
+    board, where it lands."""
+    other = pos.occupied[board ^ 1]
+    targets = move_targets(pos, board, sq, piece) & ~(other[WHITE] | other[BLACK])
+    enemy = pos.occupied[board][piece >> 3 ^ 1]
+    return targets & ~enemy, targets & enemy
+
+
+def generate_piece_moves(pos, board, sq, piece):
+    """Pseudo-legal Alice moves of one piece: legal on `board` and landing on
+    a square that is empty on the other board."""
+    quiet, captures = piece_targets(pos, board, sq, piece)
+    base = sq | board << 12 | piece << 13
+    squares = pos.squares
+    moves = [base | end << 6 for end in iter_bits(quiet)]
+    for end in iter_bits(captures):
+        moves.append(base | end << 6 | squares[board << 6 | end] << 17)
+    return moves
+
+
+def generate_moves(pos, color=None):
+    """All pseudo-legal Alice moves for `color` (default: side to move)."""
+    if color is None:
+        color = pos.turn
+    moves = []
+    first = color << 3 | PAWN
+    for board in (MAIN, TELEPORT):
+        pieces = pos.pieces[board]
+        for piece in range(first, first + KING):
+            for sq in iter_bits(pieces[piece]):
+                moves.extend(generate_piece_moves(pos, board, sq, piece))
+    return moves
+
+
+def generate_captures(pos):
+    """The captures among generate_moves(pos), in the same order."""
+    moves = []
+    squares = pos.squares
+    first = pos.turn << 3 | PAWN
+    for board in (MAIN, TELEPORT):
+        pieces = pos.pieces[board]
+        for piece in range(first, first + KING):
+            for sq in iter_bits(pieces[piece]):
+                captures = piece_targets(pos, board, sq, piece)[1]
+                base = sq | board << 12 | piece << 13
+                for end in iter_bits(captures):
+                    moves.append(base | end << 6 | squares[board << 6 | end] << 17)
+    return moves
+
+
+def generate_quiet_moves(pos):
+    """The non-captures among generate_moves(pos), in the same order."""
+    moves = []
+    first = pos.turn << 3 | PAWN
+    for board in (MAIN, TELEPORT):
+        pieces = pos.pieces[board]
+        for piece in range(first, first + KING):
+            for sq in iter_bits(pieces[piece]):
+                base = sq | board << 12 | piece << 13
+                moves.extend(base | end << 6 for end in iter_bits(piece_targets(pos, board, sq, piece)[0]))
+    return moves
+
+
+def is_pseudo_legal(pos, move):
+    """Whether `move` is in generate_moves(pos); cheap enough for moves that
+    come from the hash table or killer slots of another position."""
+    board = move >> 12 & 1
+    start = move & 63
+    piece = move >> 13 & 15
+    if piece >> 3 != pos.turn or pos.squares[board << 6 | start] != piece:
+        return False
+    return move in generate_piece_moves(pos, board, start, piece)
+
+
+def key_after(pos, move):
+    """Zobrist key of `pos` once `move` is made, without making it."""
+    end = move >> 6 & 63
+    board = move >> 12 & 1
+    piece = move >> 13 & 15
+    captured = move >> 17 & 15
+    key = pos.key ^ SIDE_KEY ^ PIECE_KEYS[board][piece][move & 63] ^ PIECE_KEYS[board ^ 1][piece][end]
+    if captured:
+        key ^= PIECE_KEYS[board][captured][end]
+    return key
+
+
+def is_legal(pos, move):
+    color = move >> 16 & 1
+    pos.make(move)
+    in_check = is_in_check(pos, color)
+    pos.unmake()
+    return not in_check
@@ -0,0 +1,116 @@
+import time
+from bitboard import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from movegen import generate_captures, generate_quiet_moves, is_pseudo_legal
+
+# Victim/attacker weights for most-valuable-victim / least-valuable-attacker.
+ORDER_VALUES = {PAWN: 1, KNIGHT: 3, BISHOP: 3, ROOK: 5, QUEEN: 9, KING: 20}
+
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORE = 1 << 27
+MAX_PLY = 64
+CUTOFF_BUCKETS = 16
+
+
+def _capture_score(move):
+    victim = ORDER_VALUES[move >> 17 & 7]
+    attacker = ORDER_VALUES[move >> 13 & 7]
+    return CAPTURE_SCORE + victim * 64 - attacker
+
+
+def _history_index(move):
+    # piece, destination board and end square
+    return (move >> 13 & 15) << 7 | (move >> 12 & 1 ^ 1) << 6 | move >> 6 & 63
+
+
+class MoveOrderer:
+    """Killer slots per ply, a history table that lives for the whole game
+    and counts of beta cutoffs by the index of the move that caused them."""
+
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (16 << 7)
+        self.cutoffs = [0] * CUTOFF_BUCKETS
+        self.nodes = 0
+
+    def new_search(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [h >> 1 for h in self.history]
+        self.cutoffs = [0] * CUTOFF_BUCKETS
+        self.nodes = 0
+
+    def order(self, moves, ply, hash_move=None):
+        self.nodes += 1
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+
+        def score(move):
+            if move == hash_move:
+                return HASH_SCORE
+            if move >> 17:
+                return _capture_score(move)
+            if move == killers[0]:
+                return KILLER_SCORE + 1
+            if move == killers[1]:
+                return KILLER_SCORE
+            return history[_history_index(move)]
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def staged(self, pos, ply, hash_move=None, stats=None):
+        """Yield the moves of `pos` in the order order() would sort them,
+        generating each stage only once the one before it is used up: the
+        hash move, captures, killers, then quiet moves. A cutoff simply stops
+        the iteration, so the later stages are never generated."""
+        self.nodes += 1
+        if hash_move is not None and is_pseudo_legal(pos, hash_move):
+            yield hash_move
+        else:
+            hash_move = None
+
+        if stats is not None:
+            started = time.perf_counter()
+        captures = generate_captures(pos)
+        captures.sort(key=_capture_score, reverse=True)
+        if stats is not None:
+            stats.add_time('generate', time.perf_counter() - started)
+        for move in captures:
+            if move != hash_move:
+                yield move
+
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        for move in killers:
+            if move is not None and move != hash_move and is_pseudo_legal(pos, move):
+                yield move
+
+        if stats is not None:
+            started = time.perf_counter()
+        history = self.history
+        quiet = generate_quiet_moves(pos)
+        quiet.sort(key=lambda move: history[_history_index(move)], reverse=True)
+        if stats is not None:
+            stats.add_time('generate', time.perf_counter() - started)
+        for move in quiet:
+            if move != hash_move and move not in killers:
+                yield move
+
+    def record_cutoff(self, move, ply, depth, index):
+        self.cutoffs[min(index, CUTOFF_BUCKETS - 1)] += 1
+        if move >> 17:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[_history_index(move)] += depth * depth
+
+    def cutoff_stats(self):
+        total = sum(self.cutoffs)
+        return {
+            'nodes': self.nodes,
+            'cutoffs': total,
+            'first_move_rate': self.cutoffs[0] / total if total else 0.0,
+            'by_index': list(self.cutoffs),
+        }
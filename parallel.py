@@ -0,0 +1,155 @@
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+import ia
+from bitboard import pack_position, unpack_position
+from movegen import generate_moves
+
+_pool = None
+_pool_size = 0
+# Set by the parent to stop the searches running in the pool.
+_cancel = None
+_search_id = 0
+
+# In pool processes: the search whose killers and history are loaded.
+_worker_search_id = None
+
+# How often the parent checks should_stop while the pool searches, in seconds.
+STOP_POLL_SECONDS = 0.05
+
+
+def _init_worker(cancel):
+    # Runs once in each pool process; ia polls search_stop during the search.
+    ia.search_stop = cancel.is_set
+
+
+def get_pool(processes):
+    # One pool per process, reused between searches so the workers keep
+    # their transposition tables warm.
+    global _pool, _pool_size, _cancel
+    if _pool is None or _pool_size != processes:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+        _cancel = multiprocessing.Event()
+        _pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                    initargs=(_cancel,))
+        _pool_size = processes
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool, _pool_size = None, 0
+
+
+def _search_root_move(data, move, depth, alpha, time_left, search_id):
+    # Runs in a pool process. Returns a None score when time ran out or the
+    # search was cancelled.
+    global _worker_search_id
+    if search_id != _worker_search_id:
+        # First task of a new search: age killers and history as
+        # iterative_deepening does.
+        ia.move_orderer.new_search()
+        _worker_search_id = search_id
+    # Each task is a root search of its own, as find_best_move is.
+    ia.transposition_table.new_search()
+    pos = unpack_position(data)
+    ia.nodes_searched = 0
+    ia.search_deadline = time.perf_counter() + time_left
+    pos.make(move)
+    try:
+        if alpha == -math.inf:
+            score = -ia.negamax(pos, depth - 1, -math.inf, math.inf)
+        else:
+            # Only a move that beats alpha needs an exact score; prove the
+            # rest worse with a zero window, as find_best_move does.
+            score = -ia.negamax(pos, depth - 1, -alpha - 1, -alpha)
+            if score > alpha:
+                score = -ia.negamax(pos, depth - 1, -math.inf, -alpha)
+    except ia.SearchTimeout:
+        score = None
+    finally:
+        ia.search_deadline = None
+    return move, score, ia.nodes_searched
+
+
+def parallel_root_search(pos, root_moves, depth, processes, deadline, should_stop=None):
+    """Search `root_moves` to `depth` across the pool and return
+    (scores, nodes), or None when an iteration did not finish in time or
+    `should_stop()` turned true.
+
+    The first move, normally the best of the previous iteration, is searched
+    alone to get a real alpha; the rest go out in batches of `processes`
+    moves, each searched with a zero window at alpha, which is refreshed
+    after each batch.
+    """
+    pool = get_pool(processes)
+    _cancel.clear()
+    data = pack_position(pos)
+    alpha = -math.inf
+    scores = {}
+    nodes = 0
+    batches = [root_moves[:1]] + [root_moves[i:i + processes] for i in range(1, len(root_moves), processes)]
+
+    for batch in batches:
+        time_left = deadline - time.perf_counter()
+        if time_left <= 0:
+            return None
+        futures = [pool.submit(_search_root_move, data, move, depth, alpha, time_left, _search_id)
+                   for move in batch]
+        while should_stop is not None and not _cancel.is_set():
+            if not wait(futures, timeout=STOP_POLL_SECONDS).not_done:
+                break
+            if should_stop():
+                _cancel.set()
+        for future in futures:
+            move, score, move_nodes = future.result()
+            if score is None:
+                return None
+            scores[move] = score
+            nodes += move_nodes
+            alpha = max(alpha, score)
+    return scores, nodes
+
+
+def parallel_iterative_deepening(pos, time_ms, processes, max_depth=32, on_progress=None,
+                                 should_stop=None):
+    """Like ia.iterative_deepening, with the root moves of each iteration
+    searched by `processes` pool workers."""
+    global _search_id
+    _search_id += 1
+    start = time.perf_counter()
+    deadline = start + time_ms / 1000
+    root_moves = [move for move in generate_moves(pos) if ia.validate_move(pos, move)]
+    if not root_moves:
+        return None, -math.inf, 0
+    # Depth 1 is cheap; do it here so there is always a move to play.
+    best_move, best_eval = ia.find_best_move(pos.copy(), 1)
+    completed = 1
+    nodes = 0
+    root_moves.sort(key=lambda move: move != best_move)
+
+    for depth in range(2, max_depth + 1):
+        if should_stop is not None and should_stop():
+            break
+        result = parallel_root_search(pos, root_moves, depth, processes, deadline, should_stop)
+        if result is None:
+            break
+        scores, iteration_nodes = result
+        nodes += iteration_nodes
+        # Fail-low scores are only upper bounds, but the best one is exact,
+        # and sorting by them still puts the strongest replies first.
+        root_moves.sort(key=lambda move: scores[move], reverse=True)
+        best_move, best_eval, completed = root_moves[0], scores[root_moves[0]], depth
+        if ia.verbose:
+            print(f"Profundidad {depth}: {best_eval} ({nodes} nodos, {processes} procesos, "
+                  f"{time.perf_counter() - start:.2f}s)")
+        if on_progress is not None:
+            on_progress(depth, nodes, best_eval, best_move)
+        if time.perf_counter() - start > (time_ms / 1000) / 2:
+            break
+
+    return best_move, best_eval, completed
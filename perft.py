@@ -0,0 +1,128 @@
+import argparse
+import sys
+import time
+from bitboard import from_notation, is_in_check
+from movegen import generate_moves, move_to_text
+from zobrist import compute_key
+from heuristic import compute_score
+
+START_POSITION = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 8/8/8/8/8/8/8/8 w'
+
+# (name, position, {depth: leaf count}) checked by --check. The counts were
+# cross-checked against game_logic.is_valid_move on the list boards.
+REFERENCE_POSITIONS = [
+    ('start', START_POSITION,
+     {1: 20, 2: 400, 3: 9388, 4: 219533}),
+    ('mated', 'rnbqk1nr/pppp1ppp/8/8/1b6/8/P1P1PPPP/R1BQKBNR 8/8/8/4p3/8/1P1P4/3N4/8 w',
+     {1: 0, 2: 0}),
+    ('opening', '1nbqkbnr/2ppp1pp/8/8/3P4/8/P3PPP1/R1BQKBNR 8/8/pp6/5p2/rPP4P/8/8/8 w',
+     {1: 31, 2: 645, 3: 21340}),
+    ('middlegame', '2bnkb1r/1ppp1ppp/8/4p3/6nR/8/P3P3/R1B1KBN1 8/8/r7/p2Q4/8/NPPP1P1P/8/8 w',
+     {1: 42, 2: 1420, 3: 59855, 4: 1953577}),
+    ('split', 'rn2k1nr/1pp2qpp/8/2P1P3/8/2b5/P4PPP/2B2B1R 8/3b4/p7/5p2/1P2P3/NQ5N/4K3/1R6 w',
+     {1: 45, 2: 1922, 3: 78230}),
+    ('kings apart', 'rn5r/1B4p1/8/4P1P1/p2p3P/b7/P4P2/R1B4R 5k2/4n3/1p1qp3/2p4p/2P2p2/2NP4/3QN3/5K2 w',
+     {1: 36, 2: 1210, 3: 43929}),
+]
+
+# --check also compares Position.key and Position.score with
+# zobrist.compute_key and heuristic.compute_score this deep.
+INCREMENTAL_DEPTH = 2
+
+
+def perft(pos, depth):
+    """Number of legal move sequences of length `depth` from `pos`."""
+    color = pos.turn
+    nodes = 0
+    for move in generate_moves(pos):
+        pos.make(move)
+        if not is_in_check(pos, color):
+            nodes += 1 if depth == 1 else perft(pos, depth - 1)
+        pos.unmake()
+    return nodes
+
+
+def divide(pos, depth):
+    """Leaf counts per legal root move, as {move text: nodes}."""
+    color = pos.turn
+    counts = {}
+    for move in generate_moves(pos):
+        pos.make(move)
+        if not is_in_check(pos, color):
+            counts[move_to_text(move)] = 1 if depth == 1 else perft(pos, depth - 1)
+        pos.unmake()
+    return counts
+
+
+def incremental_mismatches(pos, depth):
+    """Number of positions up to `depth` plies (pseudo-legal moves) from
+    `pos` where the state make/unmake keep up to date differs from a
+    recomputation from scratch."""
+    mismatches = pos.key != compute_key(pos) or pos.score != compute_score(pos)
+    if depth:
+        for move in generate_moves(pos):
+            pos.make(move)
+            mismatches += incremental_mismatches(pos, depth - 1)
+            pos.unmake()
+        mismatches += pos.key != compute_key(pos) or pos.score != compute_score(pos)
+    return mismatches
+
+
+def timed_perft(pos, depth):
+    start = time.perf_counter()
+    nodes = perft(pos, depth)
+    elapsed = time.perf_counter() - start
+    return nodes, elapsed
+
+
+def check_references(max_nodes=None):
+    failures = 0
+    for name, position, counts in REFERENCE_POSITIONS:
+        for depth, expected in sorted(counts.items()):
+            if max_nodes is not None and expected > max_nodes:
+                continue
+            nodes, elapsed = timed_perft(from_notation(position), depth)
+            status = 'ok' if nodes == expected else f'FAIL (expected {expected})'
+            print(f"{name} depth {depth}: {nodes} nodes, {nodes / max(elapsed, 1e-9):.0f} nps {status}")
+            failures += nodes != expected
+        mismatches = incremental_mismatches(from_notation(position), INCREMENTAL_DEPTH)
+        print(f"{name} incremental state to depth {INCREMENTAL_DEPTH}: "
+              f"{'ok' if not mismatches else f'FAIL ({mismatches} positions)'}")
+        failures += mismatches
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count Alice chess move paths (perft).")
+    parser.add_argument('--position', default=START_POSITION,
+                        help="two-board position, see bitboard.to_notation")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help="break the count down per root move")
+    parser.add_argument('--check', action='store_true', help="verify the stored reference counts and incremental state")
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help="with --check, skip reference counts above this size")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = check_references(args.max_nodes)
+        print("OK" if not failures else f"{failures} mismatches")
+        return 1 if failures else 0
+
+    pos = from_notation(args.position)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(pos, args.depth)
+        for text in sorted(counts):
+            print(f"{text}: {counts[text]}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(pos, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}")
+    print(f"Time: {elapsed:.3f}s")
+    print(f"NPS: {nodes / max(elapsed, 1e-9):.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,10 @@
-import os
-import pygame
 from settings import ROWS, COLS, SQUARE_SIZE, WIDTH
+from tablero import draw_square
 
-def load_images():
-    pieces = ['wp', 'wr', 'wn', 'wb', 'wq', 'wk', 
-              'bp', 'br', 'bn', 'bb', 'bq', 'bk']
-    images = {}
-    for piece in pieces:
-        image_path = os.path.join("png", f"{piece}.png")  
-        
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
-        
-        images[piece] = pygame.image.load(image_path)
-        images[piece] = pygame.transform.scale(images[piece], (SQUARE_SIZE, SQUARE_SIZE))
-    return images
-
+BOARD_OFFSETS = (0, WIDTH + 20)
 
 def draw_pieces_on_boards(screen, images, board1, board2):
-    for i, (board, offset) in enumerate(zip([board1, board2], [0, WIDTH + 20])):
+    for i, (board, offset) in enumerate(zip([board1, board2], BOARD_OFFSETS)):
         for row in range(ROWS):
             for col in range(COLS):
                 piece = board[row][col]
@@ -28,3 +14,20 @@ def draw_pieces_on_boards(screen, images, board1, board2):
                         (col * SQUARE_SIZE + offset, row * SQUARE_SIZE)
                     )
 
+
+def draw_changed_squares(screen, images, board1, board2, drawn):
+    """Redraw only the squares whose piece differs from `drawn`, the two
+    boards as they were last put on screen, and bring `drawn` up to date.
+    Returns the dirty rectangles for pygame.display.update."""
+    dirty = []
+    for board, shown, offset in zip((board1, board2), drawn, BOARD_OFFSETS):
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board[row][col]
+                if shown[row][col] != piece:
+                    rect = draw_square(screen, row, col, offset)
+                    if piece:
+                        screen.blit(images[piece], rect)
+                    shown[row][col] = piece
+                    dirty.append(rect)
+    return dirty
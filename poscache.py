@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from bitboard import is_in_check
+from movegen import generate_moves, is_legal, key_after
+from settings import CHECK_CACHE_MB, LEGAL_COUNT_CACHE_MB
+
+# Size of one entry of a full cache on CPython, measured with tracemalloc:
+# the int key, the OrderedDict node and the dict's share of its hash table
+# (about 194 bytes), rounded up.
+ENTRY_BYTES = 200
+
+
+class ResultCache:
+    """Bounded LRU map from position keys to results that depend only on the
+    position, such as "is the side that just moved in check".
+
+    Keys are Zobrist keys (which include the side to move) shifted left by
+    one, with the colour the result is about in the low bit.
+    """
+
+    def __init__(self, size_mb=4):
+        self.max_entries = max(1, size_mb * 1024 * 1024 // ENTRY_BYTES)
+        self.entries = OrderedDict()
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def get(self, key):
+        self.probes += 1
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+# Shared by the searches of one process, like ia.transposition_table.
+check_cache = ResultCache(CHECK_CACHE_MB)
+legal_count_cache = ResultCache(LEGAL_COUNT_CACHE_MB)
+
+
+def leaves_in_check(pos, move):
+    """Whether `move` leaves the side to move in check (it is illegal),
+    answered from check_cache when the resulting position was seen before."""
+    color = pos.turn
+    key = key_after(pos, move) << 1 | color
+    in_check = check_cache.get(key)
+    if in_check is None:
+        pos.make(move)
+        in_check = is_in_check(pos, color)
+        pos.unmake()
+        check_cache.put(key, in_check)
+    return in_check
+
+
+def legal_move_count(pos):
+    """Number of legal moves of the side to move, cached per position."""
+    key = pos.key << 1 | pos.turn
+    count = legal_count_cache.get(key)
+    if count is None:
+        count = sum(1 for move in generate_moves(pos) if is_legal(pos, move))
+        legal_count_cache.put(key, count)
+    return count
@@ -0,0 +1,225 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+import ia
+from bitboard import from_notation, to_notation, is_in_check
+from ia_greed import busqueda_greedy
+from movegen import generate_moves, is_legal, move_to_text, move_from_text
+from ordering import MoveOrderer
+from poscache import legal_move_count
+from perft import START_POSITION
+from stats import SearchStats
+from transposition import TranspositionTable
+
+# Headless games between engine settings. Nothing here imports pygame.
+#
+# Engine specs: 'greedy', or 'minimax[:time_ms[:max_depth]]'.
+#
+# Games are played in pairs from the same opening with colours swapped. An
+# opening is `random_plies` random legal moves drawn from the run's seed and
+# the pair number, so a run can be replayed from the seed in its records.
+
+
+def parse_engine(spec):
+    parts = spec.split(':')
+    if parts[0] == 'greedy' and len(parts) == 1:
+        return ('greedy', None, None)
+    if parts[0] == 'minimax' and len(parts) <= 3:
+        time_ms = int(parts[1]) if len(parts) > 1 else 1000
+        max_depth = int(parts[2]) if len(parts) > 2 else 32
+        return ('minimax', time_ms, max_depth)
+    raise ValueError(f"Unknown engine spec: {spec!r}")
+
+
+class SideState:
+    """Search tables of one side of a game. They are swapped into ia before
+    that side moves, so the engines compared never share results, killers
+    or history."""
+
+    def __init__(self):
+        self.transposition_table = TranspositionTable()
+        self.move_orderer = MoveOrderer()
+
+    def activate(self):
+        ia.transposition_table = self.transposition_table
+        ia.move_orderer = self.move_orderer
+
+
+def random_opening(start, plies, rng):
+    """Up to `plies` random legal moves from `start`, as move texts."""
+    pos = from_notation(start)
+    moves = []
+    for _ in range(plies):
+        legal = [move for move in generate_moves(pos) if is_legal(pos, move)]
+        if not legal:
+            break
+        move = rng.choice(legal)
+        moves.append(move_to_text(move))
+        pos.make(move)
+    return moves
+
+
+def engine_move(pos, engine, stats=None):
+    kind, time_ms, max_depth = engine
+    if kind == 'greedy':
+        result = busqueda_greedy(pos, 50, stats)
+        return result[0] if result else None
+    move, _, _ = ia.iterative_deepening(pos, time_ms, max_depth, stats=stats)
+    return move
+
+
+def only_kings(pos):
+    return all(not bb for board in pos.pieces for piece, bb in enumerate(board) if piece & 7 != 6)
+
+
+def play_game(white, black, start=START_POSITION, max_plies=200, collect_stats=False, opening=()):
+    """Play one game and return a JSON-ready record of it; with
+    `collect_stats` the record also gets per-side search statistics.
+    The `opening` move texts are played first, as part of the game."""
+    pos = from_notation(start)
+    engines = {'w': parse_engine(white), 'b': parse_engine(black)}
+    # Each side starts the game with empty tables of its own.
+    states = {'w': SideState(), 'b': SideState()}
+    think_time = {'w': 0.0, 'b': 0.0}
+    move_count = {'w': 0, 'b': 0}
+    stats = {'w': SearchStats(), 'b': SearchStats()} if collect_stats else {'w': None, 'b': None}
+    moves = []
+    for text in opening:
+        pos.make(move_from_text(pos, text))
+        moves.append(text)
+    seen = {pos.key: 1}
+    result, reason = '1/2-1/2', 'max plies'
+
+    while len(moves) < max_plies:
+        side = 'wb'[pos.turn]
+        if not legal_move_count(pos):
+            if is_in_check(pos, pos.turn):
+                result, reason = ('0-1' if side == 'w' else '1-0'), 'mate'
+            else:
+                reason = 'stalemate'
+            break
+        if only_kings(pos):
+            reason = 'insufficient material'
+            break
+        states[side].activate()
+        started = time.perf_counter()
+        move = engine_move(pos, engines[side], stats[side])
+        think_time[side] += time.perf_counter() - started
+        move_count[side] += 1
+        moves.append(move_to_text(move))
+        pos.make(move)
+        seen[pos.key] = seen.get(pos.key, 0) + 1
+        if seen[pos.key] >= 3:
+            reason = 'repetition'
+            break
+
+    record = {
+        'white': white,
+        'black': black,
+        'start': start,
+        'opening_plies': len(opening),
+        'result': result,
+        'reason': reason,
+        'plies': len(moves),
+        'moves': moves,
+        'final': to_notation(pos),
+        'time': think_time,
+        'moves_by_side': move_count,
+    }
+    if collect_stats:
+        record['stats'] = {side: side_stats.to_dict() for side, side_stats in stats.items()}
+    return record
+
+
+def _play(job):
+    index, white, black, start, max_plies, collect_stats, seed, opening = job
+    started = time.perf_counter()
+    record = play_game(white, black, start, max_plies, collect_stats, opening)
+    record['game'] = index
+    record['seed'] = seed
+    record['seconds'] = time.perf_counter() - started
+    return record
+
+
+def _init_worker():
+    ia.verbose = False
+
+
+def run_tournament(engine_a, engine_b, games, processes, output, start=START_POSITION, max_plies=200,
+                   collect_stats=False, seed=0, random_plies=4):
+    """Play `games` games, swapping colours each game, and stream one JSON
+    line per finished game to `output`. Returns the aggregate summary."""
+    jobs = []
+    for i in range(games):
+        if i % 2 == 0:
+            opening = random_opening(start, random_plies, random.Random(f"{seed}:{i // 2}"))
+        white, black = (engine_a, engine_b) if i % 2 == 0 else (engine_b, engine_a)
+        jobs.append((i, white, black, start, max_plies, collect_stats, seed, opening))
+    summary = {
+        engine_a: {'wins': 0, 'time': 0.0, 'moves': 0},
+        engine_b: {'wins': 0, 'time': 0.0, 'moves': 0},
+    }
+    draws = 0
+
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool, open(output, 'a') as out:
+        for record in pool.imap_unordered(_play, jobs):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            for side, spec in (('w', record['white']), ('b', record['black'])):
+                summary[spec]['time'] += record['time'][side]
+                summary[spec]['moves'] += record['moves_by_side'][side]
+            if record['result'] == '1-0':
+                summary[record['white']]['wins'] += 1
+            elif record['result'] == '0-1':
+                summary[record['black']]['wins'] += 1
+            else:
+                draws += 1
+
+    report = {'games': games, 'seed': seed, 'draws': draws, 'draw_rate': draws / games if games else 0.0}
+    for spec, totals in summary.items():
+        report[spec] = {
+            'wins': totals['wins'],
+            'win_rate': totals['wins'] / games if games else 0.0,
+            'avg_move_time': totals['time'] / totals['moves'] if totals['moves'] else 0.0,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Alice chess self-play.")
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--engine-a', default='minimax:200')
+    parser.add_argument('--engine-b', default='greedy')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--output', default='selfplay.jsonl', help="JSONL file, appended to")
+    parser.add_argument('--start', default=START_POSITION, help="two-board starting position")
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--random-plies', type=int, default=4,
+                        help="random legal moves opening each pair of games")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed of the random openings (default: a new one, printed)")
+    parser.add_argument('--stats', action='store_true', help="add per-side search statistics to each record")
+    args = parser.parse_args(argv)
+
+    if args.engine_a == args.engine_b:
+        parser.error("the two engine specs must differ")
+    parse_engine(args.engine_a)
+    parse_engine(args.engine_b)
+
+    seed = args.seed if args.seed is not None else random.randrange(1 << 32)
+    report = run_tournament(args.engine_a, args.engine_b, args.games, args.processes,
+                            args.output, args.start, args.max_plies, args.stats,
+                            seed, args.random_plies)
+    for spec in (args.engine_a, args.engine_b):
+        stats = report[spec]
+        print(f"{spec}: {stats['wins']} wins ({stats['win_rate']:.1%}), "
+              f"{stats['avg_move_time'] * 1000:.1f} ms/move")
+    print(f"draws: {report['draws']} ({report['draw_rate']:.1%}) of {report['games']} games, seed {seed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
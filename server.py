@@ -0,0 +1,165 @@
+import sys
+import time
+import ia
+from bitboard import from_notation, to_notation, is_in_check
+from heuristic import MATE_SCORE, MATE_THRESHOLD
+from ia_greed import busqueda_greedy
+from movegen import move_from_text, move_to_text, is_legal
+from perft import START_POSITION
+from stats import SearchStats
+
+# A UCI-like protocol over stdin/stdout for two-board positions:
+#
+#   uci | isready | newgame | quit
+#   position startpos [moves Me2e4 ...]
+#   position notation <main> <teleport> <w|b> [moves ...]
+#   go [movetime <ms>] [depth <n>] [greedy] [stats]
+#   d                      print the current position
+#
+# "go" streams "info depth .. score cp|mate .. nodes .. nps .. time .. pv .."
+# lines and ends with "bestmove <move>" (or "bestmove (none)"); with "stats"
+# an "info string stats {json}" line comes right before it. The process
+# keeps the transposition table and move-ordering history between commands.
+# Invalid positions (a king missing, the side not to move in check) and
+# errors while running a command are reported as "info string" lines; the
+# process keeps serving.
+
+DEFAULT_MOVETIME = 1000
+NO_TIME_LIMIT = 10 ** 9
+
+
+def format_score(score):
+    if score > MATE_THRESHOLD:
+        return f"mate {(MATE_SCORE - score + 1) // 2}"
+    if score < -MATE_THRESHOLD:
+        return f"mate -{(MATE_SCORE + score) // 2}"
+    return f"cp {score}"
+
+
+class EngineSession:
+    def __init__(self, write):
+        self.write = write
+        self.pos = from_notation(START_POSITION)
+
+    def handle(self, line):
+        """Run one command line; returns False once the session should end."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'quit':
+            return False
+        try:
+            self.dispatch(command, args)
+        except Exception as error:
+            # One bad command must not take the warm process down with it.
+            self.write(f"info string error: {type(error).__name__}: {error}")
+            if command == 'go':
+                self.write("bestmove (none)")
+        return True
+
+    def dispatch(self, command, args):
+        if command == 'uci':
+            self.write("id name Tablero-Alicia")
+            self.write("uciok")
+        elif command == 'isready':
+            self.write("readyok")
+        elif command == 'newgame':
+            ia.new_game()
+        elif command == 'position':
+            self.set_position(args)
+        elif command == 'go':
+            self.go(args)
+        elif command == 'd':
+            self.write(to_notation(self.pos))
+        else:
+            self.write(f"info string unknown command: {command}")
+
+    def set_position(self, args):
+        if 'moves' in args:
+            split = args.index('moves')
+            args, moves = args[:split], args[split + 1:]
+        else:
+            moves = []
+        try:
+            if args[:1] == ['startpos']:
+                pos = from_notation(START_POSITION)
+            elif args[:1] == ['notation']:
+                pos = from_notation(' '.join(args[1:]))
+            else:
+                raise ValueError("expected 'startpos' or 'notation'")
+            if pos.kings[0] is None or pos.kings[1] is None:
+                raise ValueError("both kings must be on the boards")
+            if is_in_check(pos, pos.turn ^ 1):
+                raise ValueError("the side not to move is in check")
+        except ValueError as error:
+            self.write(f"info string invalid position: {error}")
+            return
+        for text in moves:
+            move = move_from_text(pos, text)
+            if move is None or not is_legal(pos, move):
+                self.write(f"info string illegal move: {text}")
+                return
+            pos.make(move)
+        self.pos = pos
+
+    def go(self, args):
+        options = {}
+        i = 0
+        while i < len(args):
+            if args[i] in ('movetime', 'depth') and i + 1 < len(args):
+                if not args[i + 1].isdigit():
+                    self.write(f"info string invalid {args[i]}: {args[i + 1]}")
+                    return
+                options[args[i]] = int(args[i + 1])
+                i += 2
+            else:
+                options[args[i]] = True
+                i += 1
+
+        stats = SearchStats() if options.get('stats') else None
+        if options.get('greedy'):
+            result = busqueda_greedy(self.pos, 50, stats)
+            self.write_stats(stats)
+            self.write(f"bestmove {move_to_text(result[0]) if result else '(none)'}")
+            return
+
+        if 'depth' in options and 'movetime' not in options:
+            time_ms = NO_TIME_LIMIT
+        else:
+            time_ms = options.get('movetime', DEFAULT_MOVETIME)
+        start = time.perf_counter()
+
+        def on_progress(depth, nodes, score, move):
+            elapsed = time.perf_counter() - start
+            pv = ' '.join(move_to_text(m) for m in ia.principal_variation(self.pos, depth))
+            self.write(f"info depth {depth} score {format_score(score)} nodes {nodes} "
+                       f"nps {int(nodes / max(elapsed, 1e-6))} time {int(elapsed * 1000)} pv {pv}")
+
+        max_depth = max(1, options.get('depth', 32))
+        move, _, _ = ia.iterative_deepening(self.pos, time_ms, max_depth,
+                                            on_progress=on_progress, stats=stats)
+        self.write_stats(stats)
+        self.write(f"bestmove {move_to_text(move) if move is not None else '(none)'}")
+
+    def write_stats(self, stats):
+        if stats is not None:
+            self.write(f"info string stats {stats.to_json()}")
+
+
+def main():
+    ia.verbose = False
+
+    def write(text):
+        sys.stdout.write(text + '\n')
+        sys.stdout.flush()
+
+    session = EngineSession(write)
+    for line in sys.stdin:
+        if not session.handle(line):
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
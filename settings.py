@@ -2,6 +2,15 @@ WIDTH, HEIGHT = 400, 400
 ROWS, COLS = 8, 8
 SQUARE_SIZE = WIDTH // COLS
 
+# Time the minimax player may think per move, in milliseconds.
+AI_TIME_MS = 1000
+# Processes that share the root moves of a minimax search; 1 searches in
+# the worker process itself.
+SEARCH_PROCESSES = 1
+# Memory caps of the per-position result caches in poscache, in megabytes.
+CHECK_CACHE_MB = 4
+LEGAL_COUNT_CACHE_MB = 1
+
 INITIAL_BOARD = [
     ['br', 'bn', 'bb', 'bq', 'bk', 'bb', 'bn', 'br'],
     ['bp', 'bp', 'bp', 'bp', 'bp', 'bp', 'bp', 'bp'],
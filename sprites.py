@@ -0,0 +1,59 @@
+import os
+import pygame
+from settings import SQUARE_SIZE
+
+PIECES = ['wp', 'wr', 'wn', 'wb', 'wq', 'wk',
+          'bp', 'br', 'bn', 'bb', 'bq', 'bk']
+
+PNG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "png")
+CACHE_DIR = os.path.join(PNG_DIR, "cache")
+
+# Atlases already loaded in this process, by square size.
+_atlases = {}
+
+
+def atlas_path(square_size):
+    return os.path.join(CACHE_DIR, f"atlas_{square_size}.png")
+
+
+def _source_paths():
+    paths = [os.path.join(PNG_DIR, f"{piece}.png") for piece in PIECES]
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Image file not found: {path}")
+    return paths
+
+
+def _build_atlas(square_size):
+    # One row of pre-scaled sprites, in PIECES order.
+    atlas = pygame.Surface((square_size * len(PIECES), square_size), pygame.SRCALPHA)
+    for i, path in enumerate(_source_paths()):
+        image = pygame.transform.scale(pygame.image.load(path), (square_size, square_size))
+        atlas.blit(image, (i * square_size, 0))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        pygame.image.save(atlas, atlas_path(square_size))
+    except (OSError, pygame.error):
+        pass  # A read-only checkout just rebuilds the atlas next time.
+    return atlas
+
+
+def _load_atlas(square_size):
+    path = atlas_path(square_size)
+    sources = _source_paths()
+    if os.path.exists(path) and os.path.getmtime(path) >= max(map(os.path.getmtime, sources)):
+        return pygame.image.load(path)
+    return _build_atlas(square_size)
+
+
+def load_images(square_size=SQUARE_SIZE):
+    """Piece name -> sprite scaled to `square_size`, cut from one atlas that
+    is cached on disk under png/cache and rebuilt when a source PNG changes."""
+    if square_size not in _atlases:
+        atlas = _load_atlas(square_size)
+        if pygame.display.get_surface():
+            atlas = atlas.convert_alpha()
+        _atlases[square_size] = atlas
+    atlas = _atlases[square_size]
+    return {piece: atlas.subsurface((i * square_size, 0, square_size, square_size))
+            for i, piece in enumerate(PIECES)}
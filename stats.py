@@ -0,0 +1,47 @@
+import json
+
+
+class SearchStats:
+    """Counters for one or more searches, filled in only when a search is
+    given one (every hook is behind an `if stats is not None`)."""
+
+    def __init__(self):
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.check_calls = 0
+        self.tablebase_hits = 0
+        self.cutoffs_by_index = []
+        self.caches = {}
+        self.phase_seconds = {}
+
+    def add_time(self, phase, seconds):
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    def add_cutoff(self, index, count=1):
+        if index >= len(self.cutoffs_by_index):
+            self.cutoffs_by_index.extend([0] * (index + 1 - len(self.cutoffs_by_index)))
+        self.cutoffs_by_index[index] += count
+
+    def add_cache(self, name, probes, hits):
+        cache = self.caches.setdefault(name, {'probes': 0, 'hits': 0})
+        cache['probes'] += probes
+        cache['hits'] += hits
+
+    def to_dict(self):
+        total_cutoffs = sum(self.cutoffs_by_index)
+        return {
+            'nodes': self.nodes,
+            'leaf_evaluations': self.leaf_evaluations,
+            'is_in_check_calls': self.check_calls,
+            'tablebase_hits': self.tablebase_hits,
+            'cutoffs': total_cutoffs,
+            'first_move_cutoff_rate': self.cutoffs_by_index[0] / total_cutoffs if total_cutoffs else 0.0,
+            'cutoffs_by_move_index': list(self.cutoffs_by_index),
+            'caches': {name: dict(cache, hit_rate=cache['hits'] / cache['probes'] if cache['probes'] else 0.0)
+                       for name, cache in self.caches.items()},
+            'phase_seconds': dict(self.phase_seconds),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
@@ -0,0 +1,339 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from attacks import KING_ATTACKS, queen_attacks, rook_attacks
+from bitboard import WHITE, BLACK, ROOK, QUEEN, from_notation, iter_bits
+from heuristic import MATE_SCORE, DRAW_SCORE
+
+# Endgame tables for king and queen or king and rook against a lone king
+# under Alice rules, built by retrograde analysis.
+#
+# A location is board * 64 + square. Swapping the two boards and the eight
+# reflections of the board do not change the rules when there are no pawns,
+# so positions are stored with the strong king on the main board, inside
+# the a1-d1-d4 triangle; when it stands on the a1-d4 diagonal, the smaller
+# of the position and its mirror image across that diagonal is used.
+#
+# File: header b'ALTB', version (u16), piece type (u16), then one byte per
+#   ((triangle index of strong king * 128 + weak king) * 128 + piece) * 2 + side
+# where side is 0 when the strong side moves. 0 means draw (or an impossible
+# position); any other value is the distance to mate in plies plus one, a
+# win for the side to move when that distance is odd and a loss when even.
+
+MAGIC = b'ALTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+TABLE_PIECES = {'KQK': QUEEN, 'KRK': ROOK}
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+SLIDERS = {QUEEN: queen_attacks, ROOK: rook_attacks}
+
+
+def _square_transforms():
+    # Identity first, so squares already inside the triangle stay put.
+    transforms = []
+    for transpose in (False, True):
+        for flip_rows in (False, True):
+            for flip_cols in (False, True):
+                table = []
+                for sq in range(64):
+                    r, c = divmod(sq, 8)
+                    if transpose:
+                        r, c = c, r
+                    if flip_rows:
+                        r = 7 - r
+                    if flip_cols:
+                        c = 7 - c
+                    table.append(r * 8 + c)
+                transforms.append(table)
+    return transforms
+
+
+SQUARE_TRANSFORMS = _square_transforms()
+LOC_TRANSFORMS = [[loc & 64 | table[loc & 63] for loc in range(128)] for table in SQUARE_TRANSFORMS]
+# (r, c) -> (7 - c, 7 - r): the reflection that keeps the a1-h8 diagonal.
+DIAGONAL_REFLECTION = LOC_TRANSFORMS[7]
+
+TRIANGLE = [r * 8 + c for r in range(7, 3, -1) for c in range(4) if 7 - r <= c]
+TRIANGLE_INDEX = [TRIANGLE.index(sq) if sq in TRIANGLE else -1 for sq in range(64)]
+DIAGONAL = {sq for sq in TRIANGLE if 7 - sq // 8 == sq % 8}
+KING_TRANSFORM = [next(t for t, table in enumerate(SQUARE_TRANSFORMS) if table[sq] in TRIANGLE)
+                  for sq in range(64)]
+TABLE_SIZE = len(TRIANGLE) * 128 * 128 * 2
+
+
+def table_index(strong_king, weak_king, piece, side):
+    """Index of a position given as locations; any of its symmetric
+    versions gets the same index."""
+    if strong_king & 64:
+        strong_king ^= 64
+        weak_king ^= 64
+        piece ^= 64
+    transform = LOC_TRANSFORMS[KING_TRANSFORM[strong_king]]
+    strong_king, weak_king, piece = transform[strong_king], transform[weak_king], transform[piece]
+    if strong_king in DIAGONAL:
+        reflected = DIAGONAL_REFLECTION[weak_king], DIAGONAL_REFLECTION[piece]
+        if reflected < (weak_king, piece):
+            weak_king, piece = reflected
+    return ((TRIANGLE_INDEX[strong_king] * 128 + weak_king) * 128 + piece) * 2 + side
+
+
+def decode_index(index):
+    index, side = divmod(index, 2)
+    index, piece = divmod(index, 128)
+    triangle, weak_king = divmod(index, 128)
+    return TRIANGLE[triangle], weak_king, piece, side
+
+
+class TableBuilder:
+    """Retrograde analysis of king + `piece_type` against a lone king."""
+
+    def __init__(self, piece_type):
+        self.slider = SLIDERS[piece_type]
+
+    def weak_in_check(self, strong_king, weak_king, piece):
+        board = weak_king >> 6
+        bit = 1 << (weak_king & 63)
+        if strong_king >> 6 == board and KING_ATTACKS[strong_king & 63] & bit:
+            return True
+        if piece >> 6 != board:
+            return False
+        occupied = bit | 1 << (piece & 63)
+        if strong_king >> 6 == board:
+            occupied |= 1 << (strong_king & 63)
+        return bool(self.slider(piece & 63, occupied) & bit)
+
+    @staticmethod
+    def kings_touch(strong_king, weak_king):
+        return strong_king >> 6 == weak_king >> 6 and bool(
+            KING_ATTACKS[strong_king & 63] & 1 << (weak_king & 63))
+
+    def is_valid(self, strong_king, weak_king, piece, side):
+        # Three distinct locations, and the side not to move not in check.
+        if strong_king == weak_king or strong_king == piece or weak_king == piece:
+            return False
+        if side == 0:
+            return not self.weak_in_check(strong_king, weak_king, piece)
+        return not self.kings_touch(strong_king, weak_king)
+
+    @staticmethod
+    def occupancy(strong_king, weak_king, piece):
+        occupied = [0, 0]
+        for loc in (strong_king, weak_king, piece):
+            occupied[loc >> 6] |= 1 << (loc & 63)
+        return occupied
+
+    def successors(self, strong_king, weak_king, piece, side):
+        """Indices reachable with one legal move, and whether a move leaves
+        the table (the lone king taking the piece, a dead draw)."""
+        occupied = self.occupancy(strong_king, weak_king, piece)
+        found = set()
+        escapes = False
+        if side == 0:
+            board = strong_king >> 6
+            for end in iter_bits(KING_ATTACKS[strong_king & 63] & ~(occupied[board] | occupied[board ^ 1])):
+                king = (board ^ 1) << 6 | end
+                if not self.kings_touch(king, weak_king):
+                    found.add(table_index(king, weak_king, piece, 1))
+            board = piece >> 6
+            targets = self.slider(piece & 63, occupied[board]) & ~(occupied[board] | occupied[board ^ 1])
+            for end in iter_bits(targets):
+                found.add(table_index(strong_king, weak_king, (board ^ 1) << 6 | end, 1))
+        else:
+            board = weak_king >> 6
+            targets = KING_ATTACKS[weak_king & 63] & ~occupied[board ^ 1]
+            if strong_king >> 6 == board:
+                targets &= ~(1 << (strong_king & 63))
+            for end in iter_bits(targets):
+                king = (board ^ 1) << 6 | end
+                if piece == board << 6 | end:
+                    escapes = escapes or not self.kings_touch(strong_king, king)
+                elif not self.weak_in_check(strong_king, king, piece):
+                    found.add(table_index(strong_king, king, piece, 0))
+        return found, escapes
+
+    def predecessors(self, strong_king, weak_king, piece, side):
+        """Indices of the positions one non-capturing move before this one."""
+        occupied = self.occupancy(strong_king, weak_king, piece)
+        found = set()
+        if side == 1:
+            # The strong side just moved its king or its piece from the
+            # other board, landing on the same square here.
+            board = strong_king >> 6
+            end = strong_king & 63
+            if not occupied[board ^ 1] & 1 << end:
+                for start in iter_bits(KING_ATTACKS[end] & ~occupied[board ^ 1]):
+                    king = (board ^ 1) << 6 | start
+                    if self.is_valid(king, weak_king, piece, 0):
+                        found.add(table_index(king, weak_king, piece, 0))
+            board = piece >> 6
+            end = piece & 63
+            if not occupied[board ^ 1] & 1 << end:
+                for start in iter_bits(self.slider(end, occupied[board ^ 1]) & ~occupied[board ^ 1]):
+                    moved = (board ^ 1) << 6 | start
+                    if self.is_valid(strong_king, weak_king, moved, 0):
+                        found.add(table_index(strong_king, weak_king, moved, 0))
+        else:
+            board = weak_king >> 6
+            end = weak_king & 63
+            if not occupied[board ^ 1] & 1 << end:
+                for start in iter_bits(KING_ATTACKS[end] & ~occupied[board ^ 1]):
+                    king = (board ^ 1) << 6 | start
+                    if self.is_valid(strong_king, king, piece, 1):
+                        found.add(table_index(strong_king, king, piece, 1))
+        return found
+
+    def build(self):
+        values = bytearray(TABLE_SIZE)
+        remaining = bytearray(TABLE_SIZE)
+        frontier = []
+        for index in range(TABLE_SIZE):
+            position = decode_index(index)
+            if not self.is_valid(*position) or table_index(*position) != index:
+                continue
+            found, escapes = self.successors(*position)
+            remaining[index] = len(found) + escapes
+            if not remaining[index] and position[3] == 1 and self.weak_in_check(*position[:3]):
+                values[index] = 1
+                frontier.append(index)
+
+        # Level by level: positions lost in `plies` make their predecessors
+        # won in plies + 1; positions won in `plies` make a predecessor lost
+        # once every one of its moves leads to a win for the other side.
+        plies = 0
+        while frontier:
+            next_frontier = []
+            for index in frontier:
+                for previous in self.predecessors(*decode_index(index)):
+                    if values[previous]:
+                        continue
+                    if plies % 2 == 0:
+                        values[previous] = plies + 2
+                        next_frontier.append(previous)
+                    else:
+                        remaining[previous] -= 1
+                        if not remaining[previous]:
+                            values[previous] = plies + 2
+                            next_frontier.append(previous)
+            frontier = next_frontier
+            plies += 1
+        if plies > 254:
+            raise ValueError("distance to mate does not fit in a byte")
+        return values
+
+
+def table_path(name, directory=TABLE_DIR):
+    return os.path.join(directory, f"{name}.tb")
+
+
+def write_table(path, piece_type, values):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, piece_type))
+        f.write(values)
+
+
+def open_table(path):
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, piece_type = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or len(data) != HEADER.size + TABLE_SIZE:
+        data.close()
+        raise ValueError(f"{path}: not an endgame table (version {VERSION})")
+    return piece_type, data
+
+
+_tables = None
+
+
+def get_tables(directory=TABLE_DIR):
+    """{piece type: mapped table} for the table files present, loaded once."""
+    global _tables
+    if _tables is None:
+        _tables = {}
+        for name in TABLE_PIECES:
+            try:
+                piece_type, data = open_table(table_path(name, directory))
+            except (OSError, ValueError):
+                continue
+            _tables[piece_type] = data
+    return _tables
+
+
+def probe(pos):
+    """The table byte for `pos` (see the file format above), or None when
+    the position is not covered by a loaded table."""
+    tables = get_tables()
+    if not tables:
+        return None
+    occupied = pos.occupied
+    if (occupied[0][WHITE] | occupied[0][BLACK]).bit_count() + \
+            (occupied[1][WHITE] | occupied[1][BLACK]).bit_count() != 3:
+        return None
+    # Three pieces without both kings (a king was captured) are no KXK.
+    if pos.kings[WHITE] is None or pos.kings[BLACK] is None:
+        return None
+    for board in (0, 1):
+        pieces = pos.pieces[board]
+        for color in (WHITE, BLACK):
+            for piece_type, data in tables.items():
+                bb = pieces[color << 3 | piece_type]
+                if bb:
+                    strong_board, strong_sq = pos.kings[color]
+                    weak_board, weak_sq = pos.kings[color ^ 1]
+                    index = table_index(strong_board << 6 | strong_sq, weak_board << 6 | weak_sq,
+                                        board << 6 | (bb.bit_length() - 1), 0 if pos.turn == color else 1)
+                    return data[HEADER.size + index]
+    return None
+
+
+def probe_score(pos, ply):
+    """Exact score of `pos` for the side to move, with mates counted from
+    the root like the search does, or None when no table covers it."""
+    value = probe(pos)
+    if value is None:
+        return None
+    if not value:
+        return DRAW_SCORE
+    distance = value - 1
+    if distance & 1:
+        return MATE_SCORE - ply - distance
+    return -(MATE_SCORE - ply - distance)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or probe Alice endgame tables.")
+    parser.add_argument('tables', nargs='*', default=list(TABLE_PIECES),
+                        help=f"tables to build, from {', '.join(TABLE_PIECES)} (default: all)")
+    parser.add_argument('--directory', default=TABLE_DIR)
+    parser.add_argument('--probe', metavar='POSITION', help="print the table value of a two-board position")
+    args = parser.parse_args(argv)
+    for name in args.tables:
+        if name not in TABLE_PIECES:
+            parser.error(f"unknown table: {name}")
+
+    if args.probe:
+        get_tables(args.directory)
+        value = probe(from_notation(args.probe))
+        if value is None:
+            print("not in the tables")
+        elif not value:
+            print("draw")
+        else:
+            print(f"{'win' if (value - 1) & 1 else 'loss'} for the side to move, mate in {value - 1} plies")
+        return 0
+
+    for name in args.tables:
+        start = time.perf_counter()
+        values = TableBuilder(TABLE_PIECES[name]).build()
+        write_table(table_path(name, args.directory), TABLE_PIECES[name], values)
+        wins = sum(1 for index in range(0, TABLE_SIZE, 2) if values[index] & 1 == 0 and values[index])
+        print(f"{name}: longest mate {max(values) - 1} plies, {wins} won positions with the strong side "
+              f"to move, {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
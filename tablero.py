@@ -1,46 +1,51 @@
-import os
 import pygame
 import sys
+from settings import WIDTH, HEIGHT, ROWS, COLS, SQUARE_SIZE
+from sprites import load_images
 
-pygame.init()
-
-WIDTH, HEIGHT = 400, 400  
-ROWS, COLS = 8, 8
-SQUARE_SIZE = WIDTH // COLS
+# Nothing here touches pygame at import time; main() and the UI do that.
 WHITE = (240, 217, 181)
 BROWN = (181, 136, 99)
 
-def load_images():
-    pieces = ['wp', 'wr', 'wn', 'wb', 'wq', 'wk', 
-              'bp', 'br', 'bn', 'bb', 'bq', 'bk']
-    images = {}
-    for piece in pieces:
-        image_path = os.path.join("png", f"{piece}.png")  
-        
-        if not os.path.exists(image_path): 
-            raise FileNotFoundError(f"Image file not found: {image_path}")
 
-        images[piece] = pygame.image.load(image_path)
-        images[piece] = pygame.transform.scale(images[piece], (SQUARE_SIZE, SQUARE_SIZE))
-    return images
+_board_surface = None
+
+
+def board_surface():
+    # The 64 squares are drawn once; every later frame just blits them.
+    global _board_surface
+    if _board_surface is None:
+        surface = pygame.Surface((COLS * SQUARE_SIZE, ROWS * SQUARE_SIZE))
+        colors = [WHITE, BROWN]
+        for row in range(ROWS):
+            for col in range(COLS):
+                color = colors[(row + col) % 2]
+                pygame.draw.rect(
+                    surface,
+                    color,
+                    (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+                )
+        _board_surface = surface.convert() if pygame.display.get_surface() else surface
+    return _board_surface
 
 
 # Draw the chessboard
 def draw_boards(screen, offset=0):
-    colors = [WHITE, BROWN]
-    for row in range(ROWS):
-        for col in range(COLS):
-            color = colors[(row + col) % 2]
-            pygame.draw.rect(
-                screen,
-                color,
-                (col * SQUARE_SIZE + offset, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
-            )
+    screen.blit(board_surface(), (offset, 0))
+
+
+def draw_square(screen, row, col, offset=0):
+    """Repaint one empty square and return its rectangle on the screen."""
+    area = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+    rect = area.move(offset, 0)
+    screen.blit(board_surface(), rect, area)
+    return rect
 
 
 
 
 def main():
+    pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Chessboard")
     images = load_images()
@@ -0,0 +1,82 @@
+from array import array
+from heuristic import MATE_THRESHOLD
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# A slot is one item in each of the arrays below: an 8-byte key, 4-byte
+# score and move, and one byte each for depth, bound and generation.
+ENTRY_BYTES = 19
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results keyed by Zobrist key.
+
+    Scores are stored from the point of view of the side to move, with mate
+    scores counted from the stored node rather than the root. A slot is
+    overwritten by the same position, by an entry left over from an earlier
+    search, or by a search that went at least as deep.
+
+    Every field has its own preallocated array, so the table takes
+    `size_mb` megabytes however full it gets.
+    """
+
+    def __init__(self, size_mb=16):
+        size = 1
+        while size * 2 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            size *= 2
+        self.mask = size - 1
+        self._allocate(size)
+        self.probes = 0
+        self.hits = 0
+
+    def _allocate(self, size):
+        self.keys = array('Q', [0]) * size
+        self.scores = array('i', [0]) * size
+        self.moves = array('i', [0]) * size
+        self.depths = array('B', [0]) * size
+        # The bound plus one, so 0 marks an empty slot.
+        self.bounds = array('B', [0]) * size
+        self.generations = array('B', [0]) * size
+        self.generation = 0
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self._allocate(self.mask + 1)
+
+    def probe(self, key, depth, alpha, beta, ply=0):
+        """Return (score, move): score is not None when the stored bound
+        settles the window at this depth, move is the stored best move."""
+        self.probes += 1
+        index = key & self.mask
+        bound = self.bounds[index]
+        if not bound or self.keys[index] != key:
+            return None, None
+        self.hits += 1
+        move = self.moves[index] or None
+        if self.depths[index] >= depth:
+            score = self.scores[index]
+            if score > MATE_THRESHOLD:
+                score -= ply
+            elif score < -MATE_THRESHOLD:
+                score += ply
+            flag = bound - 1
+            if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                return score, move
+        return None, move
+
+    def store(self, key, depth, flag, score, move, ply=0):
+        if score > MATE_THRESHOLD:
+            score += ply
+        elif score < -MATE_THRESHOLD:
+            score -= ply
+        index = key & self.mask
+        if (not self.bounds[index] or self.keys[index] == key
+                or self.generations[index] != self.generation or depth >= self.depths[index]):
+            self.keys[index] = key
+            self.scores[index] = score
+            self.moves[index] = move or 0
+            self.depths[index] = depth
+            self.bounds[index] = flag + 1
+            self.generations[index] = self.generation
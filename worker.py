@@ -0,0 +1,123 @@
+import atexit
+import multiprocessing
+import queue
+from bitboard import from_boards
+from book import get_book
+from ia import iterative_deepening
+from ia_greed import busqueda_greedy
+from parallel import parallel_iterative_deepening, shutdown_pool
+from settings import AI_TIME_MS, SEARCH_PROCESSES
+
+
+def choose_move(board_main, board_teleport, turn, use_greedy, time_ms=AI_TIME_MS,
+                on_progress=None, should_stop=None, processes=SEARCH_PROCESSES):
+    """Pick a move for `turn` with the greedy player or with minimax.
+
+    Returns the encoded move (see movegen) or None when there is none.
+    Positions found in the opening book are answered from it without a search.
+    """
+    pos = from_boards(board_main, board_teleport, turn)
+    book = get_book()
+    if book is not None:
+        book_move = book.choose(pos)
+        if book_move is not None:
+            print("Jugada de libro.")
+            return book_move
+    if use_greedy:
+        print("Usando avara.")
+        greedy_result = busqueda_greedy(pos, 50)
+        return greedy_result[0] if greedy_result else None
+    print("Usando Minimax...")
+    if processes > 1:
+        best_move, _, _ = parallel_iterative_deepening(pos, time_ms, processes, on_progress=on_progress,
+                                                       should_stop=should_stop)
+    else:
+        best_move, _, _ = iterative_deepening(pos, time_ms, on_progress=on_progress,
+                                              should_stop=should_stop)
+    return best_move
+
+
+def _worker_loop(requests, results, current_id):
+    # Runs in the child process: one search per request, until None arrives.
+    # A search stops as soon as the parent moves current_id past its id.
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        search_id, board_main, board_teleport, turn, use_greedy, time_ms = request
+
+        def on_progress(depth, nodes, score, move):
+            results.put(('progress', search_id, depth, nodes))
+
+        def cancelled():
+            return current_id.value != search_id
+
+        if cancelled():
+            continue
+        move = choose_move(board_main, board_teleport, turn, use_greedy, time_ms,
+                           on_progress, cancelled)
+        if not cancelled():
+            results.put(('done', search_id, move))
+    shutdown_pool()
+
+
+class SearchWorker:
+    """Runs the engine in a child process so the pygame loop keeps running.
+
+    The loop starts a search with start(), calls poll() once per frame, and
+    gets the move back from poll() once the search has finished.
+    """
+
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.current_id = multiprocessing.Value('i', 0)
+        # Not a daemon, since daemonic processes may not start the root-search
+        # pool; close() runs at exit so the interpreter does not wait on it.
+        self.process = multiprocessing.Process(
+            target=_worker_loop, args=(self.requests, self.results, self.current_id))
+        self.process.start()
+        atexit.register(self.close)
+        self.search_id = 0
+        self.busy = False
+
+    def start(self, board_main, board_teleport, turn, use_greedy, time_ms=AI_TIME_MS):
+        self._next_id()
+        self.busy = True
+        self.requests.put((self.search_id, board_main, board_teleport, turn, use_greedy, time_ms))
+
+    def cancel(self):
+        self._next_id()
+        self.busy = False
+
+    def _next_id(self):
+        # Anything still in flight for the old id is ignored by poll().
+        self.search_id += 1
+        self.current_id.value = self.search_id
+
+    def poll(self):
+        """Return ('done', move) once the current search ends, else None."""
+        while True:
+            try:
+                message = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            kind, search_id = message[0], message[1]
+            if search_id != self.search_id:
+                continue
+            if kind == 'progress':
+                if self.on_progress is not None:
+                    self.on_progress(*message[2:])
+            else:
+                self.busy = False
+                return 'done', message[2]
+
+    def close(self):
+        if not self.process.is_alive():
+            return
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
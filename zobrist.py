@@ -0,0 +1,19 @@
+import random
+
+# Fixed seed so keys (and anything stored under them) are stable between runs.
+_rng = random.Random(20240917)
+
+# PIECE_KEYS[board][piece][sq], indexed like Position.pieces.
+PIECE_KEYS = [[[_rng.getrandbits(64) for _ in range(64)] for _ in range(15)] for _ in range(2)]
+SIDE_KEY = _rng.getrandbits(64)
+
+
+def compute_key(pos):
+    key = SIDE_KEY if pos.turn else 0
+    for board in (0, 1):
+        for piece, bb in enumerate(pos.pieces[board]):
+            while bb:
+                low = bb & -bb
+                key ^= PIECE_KEYS[board][piece][low.bit_length() - 1]
+                bb ^= low
+    return key